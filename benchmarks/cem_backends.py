@@ -0,0 +1,58 @@
+# coding=utf-8
+"""
+Throughput of the CEM tagging modes on the paragraphs of some documents.
+
+    python benchmarks/cem_backends.py tests/resources/*.xml --modes bert onnx rules --repeat 3
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cathodedataextractor.parse import PARAGRAPH_SEPARATOR
+from cathodedataextractor.information_extraction_pipe import Pipeline
+from cathodedataextractor.nlp import LText, cem_mode, warmup, CEM_MODES
+
+
+def paragraphs(paths):
+    for path in paths:
+        data = Pipeline._collect_corpus(*os.path.split(path))
+        for par in PARAGRAPH_SEPARATOR.join([data.experiment, data.property_text]).split(PARAGRAPH_SEPARATOR):
+            if par.strip():
+                yield par
+
+
+def run(texts, mode):
+    sentences = cems = 0
+    start = time.perf_counter()
+    with cem_mode(mode):
+        for text in texts:
+            ltext = LText(text)
+            sentences += len(ltext.sentences)
+            cems += len(ltext.cems)
+    return sentences, cems, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('documents', nargs='+', help='Xml or Html documents named after their doi.')
+    parser.add_argument('--modes', nargs='+', choices=sorted(CEM_MODES), default=sorted(CEM_MODES))
+    parser.add_argument('--repeat', type=int, default=3, help='Runs of each mode, the fastest is reported.')
+    args = parser.parse_args(argv)
+
+    texts = list(paragraphs(args.documents))
+    print('{:<6} {:>10} {:>8} {:>12} {:>8}'.format('mode', 'sentences', 'cems', 'sentences/s', 'speedup'))
+    baseline = None
+    for mode in args.modes:
+        # Model loading and the ONNX export are not timed.
+        warmup(mode)
+        sentences, cems, seconds = min((run(texts, mode) for _ in range(args.repeat)), key=lambda res: res[2])
+        rate = sentences / seconds
+        baseline = baseline or rate
+        print('{:<6} {:>10} {:>8} {:>12.1f} {:>7.2f}x'.format(mode, sentences, cems, rate, rate / baseline))
+
+
+if __name__ == '__main__':
+    main()
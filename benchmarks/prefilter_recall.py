@@ -0,0 +1,52 @@
+# coding=utf-8
+"""
+Recall of the ChemPrefilter against full BERT tagging, at several thresholds: the share of the CEMs, and of the
+sentences with CEMs, that the prefilter would still send to the tagger, and the share of sentences it skips.
+
+    python benchmarks/prefilter_recall.py tests/resources/*.xml --thresholds 1 2 3 --missed 20
+"""
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cem_backends import paragraphs
+from cathodedataextractor.nlp import LText, ChemPrefilter, tag_sentences
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('documents', nargs='+', help='Xml or Html documents named after their doi.')
+    parser.add_argument('--thresholds', nargs='+', type=int, default=[1, 2, 3])
+    parser.add_argument('--missed', type=int, default=10, help='CEMs missed at the lowest threshold to print.')
+    args = parser.parse_args(argv)
+
+    sentences = [sentence for text in paragraphs(args.documents) for sentence in LText(text).sentences]
+    # Every sentence with BERT, no prefilter is set.
+    tag_sentences(sentences)
+    cems = [[cem.text for cem in sentence.cems] for sentence in sentences]
+    total_cems = sum(map(len, cems))
+    with_cems = sum(1 for sentence_cems in cems if sentence_cems)
+    print('{} sentences, {} with CEMs, {} CEMs'.format(len(sentences), with_cems, total_cems))
+
+    print('{:>9} {:>12} {:>16} {:>10}'.format('threshold', 'CEM recall', 'sentence recall', 'skipped'))
+    for threshold in sorted(args.thresholds):
+        prefilter = ChemPrefilter(threshold)
+        kept = [prefilter(sentence.raw_tokens) for sentence in sentences]
+        kept_cems = sum(len(sentence_cems) for sentence_cems, keep in zip(cems, kept) if keep)
+        kept_with_cems = sum(1 for sentence_cems, keep in zip(cems, kept) if keep and sentence_cems)
+        print('{:>9} {:>12.4f} {:>16.4f} {:>10.4f}'.format(
+            threshold, kept_cems / total_cems if total_cems else 1., kept_with_cems / with_cems if with_cems else 1.,
+            1 - sum(kept) / len(sentences) if sentences else 0.))
+
+    prefilter = ChemPrefilter(min(args.thresholds))
+    missed = [(cem, sentence.text) for sentence, sentence_cems in zip(sentences, cems)
+              if sentence_cems and not prefilter(sentence.raw_tokens) for cem in sentence_cems]
+    for cem, text in missed[:args.missed]:
+        print('missed {!r} in: {}'.format(cem, text))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# coding=utf-8
+"""
+Time of ModiChemWordTokenizer.span_tokenize on the sentences of tests/test_nlp_tokenize.py and on synthetic
+500-token sentences, against the previous implementation that spliced the splits into the span list.
+
+    python benchmarks/span_tokenize.py --repeat 5
+"""
+import os
+import sys
+import ast
+import time
+import random
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from chemdataextractor.nlp.tokenize import regex_span_tokenize
+from cathodedataextractor.nlp.tokenizer4units import UnitsTokenizer
+
+WORDS = ['LiNi0.8Co0.1Mn0.1O2', 'delivered', '180mAhg-1', 'at', '0.1C', 'and', '25°C', 'after', '100cycles', 'with',
+         '(', 'x=0.05', ')', 'from2.8to4.3V', ',', '95.2%', 'retention', 'in', 'Li/Li+', '1.0M', 'LiPF6', 'EC:DMC']
+
+
+class SplicingTokenizer(UnitsTokenizer):
+    """
+    The previous span_tokenize, quadratic in the tokens.
+    """
+
+    def span_tokenize(self, s, additional_regex=None):
+        spans = [(left, right) for left, right in regex_span_tokenize(s, r'\s+') if not left == right]
+        i = 0
+        while i < len(spans):
+            subspans = self._subspan(s, spans[i], spans[i + 1] if i + 1 < len(spans) else None, additional_regex)
+            subspans = [subspan for subspan in subspans if subspan[1] - subspan[0] > 0]
+            spans[i:i + 1] = subspans
+            if len(subspans) == 1:
+                i += 1
+        return spans
+
+
+def literal(node):
+    # ast.Str before Python 3.8, ast.Constant after.
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        return None
+
+
+def test_sentences():
+    with open(os.path.join(ROOT, 'tests', 'test_nlp_tokenize.py'), encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    texts = [literal(node.args[0]) for node in ast.walk(tree)
+             if isinstance(node, ast.Call) and getattr(node.func, 'attr', None) == 'tokenize' and node.args]
+    return [text for text in texts if isinstance(text, str)]
+
+
+def synthetic_sentences(count, tokens=500, seed=0):
+    rng = random.Random(seed)
+    return [' '.join(rng.choice(WORDS) for _ in range(tokens)) for _ in range(count)]
+
+
+def run(tokenizer, sentences, repeat):
+    best, spans = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        spans = [tokenizer.span_tokenize(s, additional_regex=tokenizer.preposition_pattern) for s in sentences]
+        best = min(best, time.perf_counter() - start)
+    return spans, best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--synthetic', type=int, default=20, help='Synthetic 500-token sentences.')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs of each set, the fastest is reported.')
+    args = parser.parse_args(argv)
+
+    print('{:<12} {:>10} {:>12} {:>12} {:>8}'.format('sentences', 'count', 'before (ms)', 'after (ms)', 'speedup'))
+    for name, sentences in (('tests', test_sentences()), ('synthetic', synthetic_sentences(args.synthetic))):
+        before, before_seconds = run(SplicingTokenizer(), sentences, args.repeat)
+        after, after_seconds = run(UnitsTokenizer(), sentences, args.repeat)
+        if before != after:
+            sys.exit('The spans of the {} sentences differ.'.format(name))
+        print('{:<12} {:>10} {:>12.1f} {:>12.1f} {:>7.2f}x'.format(
+            name, len(sentences), 1000 * before_seconds, 1000 * after_seconds, before_seconds / after_seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# coding=utf-8
+"""
+Throughput of Pipeline.iter_extract with the cores split differently between worker processes and the intra-op
+threads of each, WORKERSxTHREADS. Oversubscribed configurations, more threads in total than cores, are marked.
+
+    python benchmarks/thread_scaling.py tests/resources/*.xml --configs 1x8 2x4 4x2 8x1 --mode bert
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cathodedataextractor.information_extraction_pipe import Pipeline
+from cathodedataextractor.nlp import CEM_MODES, warmup
+from cathodedataextractor.threads import default_threads, set_threads, cpu_count
+
+
+def parse_config(value):
+    workers, threads = value.lower().split('x')
+    return int(workers), int(threads)
+
+
+def run(paths, workers, threads, mode):
+    config = default_threads(workers)._replace(intra_op=threads)
+    if workers == 1:
+        # The documents run in this process, the pipeline only configures its workers.
+        set_threads(config)
+    pipeline = Pipeline(mode=mode, threads=config)
+    start = time.perf_counter()
+    failed = sum(1 for output in pipeline.iter_extract(paths, workers=workers) if output.error)
+    return failed, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('documents', nargs='+', help='Xml or Html documents named after their doi.')
+    parser.add_argument('--configs', nargs='+', type=parse_config,
+                        help='WORKERSxTHREADS, defaults to the powers of two splitting the cores.')
+    parser.add_argument('--mode', choices=sorted(CEM_MODES), default='bert')
+    parser.add_argument('--repeat', type=int, default=1, help='Times the documents are extracted in each run.')
+    args = parser.parse_args(argv)
+
+    cores = cpu_count()
+    configs = args.configs or [(workers, max(cores // workers, 1))
+                               for workers in (2 ** i for i in range(cores.bit_length())) if workers <= cores]
+    paths = args.documents * args.repeat
+
+    print('{} documents, {} cores'.format(len(paths), cores))
+    print('{:<10} {:>8} {:>8} {:>10} {:>8}'.format('config', 'failed', 'seconds', 'docs/s', 'speedup'))
+    # Model loading is not timed, the workers of later configurations fork with the models loaded.
+    warmup(args.mode)
+    baseline = None
+    for workers, threads in configs:
+        failed, seconds = run(paths, workers, threads, args.mode)
+        rate = len(paths) / seconds
+        baseline = baseline or rate
+        print('{:<10} {:>8} {:>8.1f} {:>10.2f} {:>7.2f}x{}'.format(
+            '{}x{}'.format(workers, threads), failed, seconds, rate, rate / baseline,
+            '  oversubscribed' if workers * threads > cores else ''))
+
+
+if __name__ == '__main__':
+    main()
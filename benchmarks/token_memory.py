@@ -0,0 +1,89 @@
+# coding=utf-8
+"""
+Memory per token of the tokenized and tagged sentences of an LText, stored compactly (span arrays, tag columns
+and slotted token views) against the previous one object with a __dict__ and a tag dict per token.
+
+    python benchmarks/token_memory.py --sentences 10000
+"""
+import os
+import sys
+import gc
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chemdataextractor.doc.text import Span
+from cathodedataextractor.nlp.cdetext import LText, NER_TAG_TYPE
+
+SENTENCES = ['The LiNi0.8Co0.1Mn0.1O2 cathode delivered a discharge capacity of 203.5 mAh g-1 at 0.1 C.',
+             'After 100 cycles at 1 C between 2.8 and 4.3 V, 95.2% of the initial capacity was retained.',
+             'Coin cells (CR2032) were assembled in an argon-filled glove box with lithium foil as the counter electrode.',
+             'The electrolyte was 1 M LiPF6 in ethylene carbonate and dimethyl carbonate (1:1 by volume).']
+
+
+class DictToken(Span):
+    """
+    The previous LRichToken.
+    """
+
+    def __init__(self, text, start, end, sentence):
+        super().__init__(text, start, end)
+        self.sentence = sentence
+        self._tags = {}
+
+
+def traced(build):
+    gc.collect()
+    tracemalloc.start()
+    kept = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, kept
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sentences', type=int, default=10000, help='Sentences of the passage.')
+    args = parser.parse_args(argv)
+
+    text = ' '.join(SENTENCES[i % len(SENTENCES)] for i in range(args.sentences))
+    sentences = LText(text).sentences
+    tokenizer = LText.word_tokenizer
+    # Tokenizing is not measured.
+    spans = tokenizer.span_tokenize_batch([sentence.text for sentence in sentences])
+    tokens = sum(map(len, spans))
+
+    def previous():
+        kept = []
+        for sentence, sentence_spans in zip(sentences, spans):
+            sentence_tokens = [DictToken(sentence.text[start:end], sentence.start + start, sentence.start + end, sentence)
+                               for start, end in sentence_spans]
+            for token in sentence_tokens:
+                token._tags[NER_TAG_TYPE] = None
+            kept.append(sentence_tokens)
+        return kept
+
+    def compact(views):
+        def build():
+            for sentence, sentence_spans in zip(sentences, spans):
+                sentence.__dict__.pop('_tokens', None)
+                sentence._set_spans(sentence_spans)
+                sentence._tag_columns[NER_TAG_TYPE] = [None] * len(sentence_spans)
+                if views:
+                    sentence.tokens
+            return sentences
+        return build
+
+    print('{} sentences, {} tokens'.format(len(sentences), tokens))
+    print('{:<32} {:>14}'.format('representation', 'bytes/token'))
+    for name, build in (('dict per token (before)', previous),
+                        ('compact, no token views', compact(False)),
+                        ('compact, token views', compact(True))):
+        size, kept = traced(build)
+        print('{:<32} {:>14.1f}'.format(name, size / tokens))
+        del kept
+
+
+if __name__ == '__main__':
+    main()
@@ -4,8 +4,18 @@ import logging
 log = logging.getLogger(__name__)
 log.addHandler(logging.NullHandler())
 
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s %(levelname)s in %(filename)s[line:%(lineno)d]--> %(message)s',
-                    datefmt='%Y-%m-%d %H:%M:%S',
-                    handlers=[logging.FileHandler('clog.txt', mode='w', encoding='utf-8')]
-                    )
+
+def configure_logging(filename: str = 'clog.txt', level: int = logging.INFO, mode: str = 'a'):
+    """
+    Send the package log to a file. Importing the package configures no logging.
+
+    Args:
+        filename (str): Log file.
+        level (int): Lowest level written.
+        mode (str): 'a' to append to the file, 'w' to truncate it.
+    """
+    logging.basicConfig(level=level,
+                        format='%(asctime)s %(levelname)s in %(filename)s[line:%(lineno)d]--> %(message)s',
+                        datefmt='%Y-%m-%d %H:%M:%S',
+                        handlers=[logging.FileHandler(filename, mode=mode, encoding='utf-8')]
+                        )
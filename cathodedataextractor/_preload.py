@@ -0,0 +1,11 @@
+# coding=utf-8
+"""
+Imported by the forkserver of the worker processes (``multiprocessing.set_forkserver_preload``),
+so the models are loaded once in the server and shared by the workers it forks.
+"""
+import gc
+
+from .information_extraction_pipe import preload
+
+preload()
+gc.freeze()
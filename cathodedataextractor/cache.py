@@ -0,0 +1,389 @@
+# coding=utf-8
+"""
+Content-addressed caches of pipeline results and sentence tags, and bounded in-memory memoization.
+"""
+import time
+import pickle
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Hashable, List, Optional
+
+from .stats import count
+
+__all__ = ['ResultCache', 'TagCache', 'LRUCache', 'pipeline_fingerprint']
+
+log = logging.getLogger(__name__)
+
+PACKAGE_PATH = Path(__file__).absolute().parent
+
+_fingerprint: Optional[str] = None
+
+
+def pipeline_fingerprint() -> str:
+    """
+    Hash of every source file of the package, rules such as ``regex_pattern.py`` included.
+
+    Any edit to the extraction code gives a new fingerprint, so results cached by an
+    older version are never returned.
+    """
+    global _fingerprint
+    if _fingerprint is None:
+        sha = hashlib.sha256()
+        for file in sorted(PACKAGE_PATH.rglob('*.py')):
+            sha.update(file.relative_to(PACKAGE_PATH).as_posix().encode())
+            sha.update(file.read_bytes())
+        _fingerprint = sha.hexdigest()
+    return _fingerprint
+
+
+class ResultCache:
+    """
+    SQLite backed cache keyed by a hash of the input plus the pipeline fingerprint.
+
+    Entries are evicted least recently used first once the stored values exceed ``max_size`` bytes.
+    Their total size is kept in the database as entries are stored, so a ``put`` does not scan the table.
+    The cache can be pickled, so it can be handed to worker processes, each opens its own connection.
+    Within a process the threads share the connection, one at a time.
+    """
+
+    def __init__(self, path: str, max_size: int = 2 ** 30, fingerprint: Optional[str] = None,
+                 touch_interval: float = 0.):
+        """
+        Args:
+            path (str): SQLite database file, created if it does not exist.
+            max_size (int): Maximum total size of the stored values in bytes. Defaults to 1 GiB.
+            fingerprint (str): Pipeline version. Defaults to ``pipeline_fingerprint()``.
+            touch_interval (float): Seconds before a hit updates the access time of an entry again. 0 writes
+                on every hit, larger values save the writes of frequent hits at the cost of a coarser LRU order.
+        """
+        self.path = str(path)
+        self.max_size = max_size
+        self.fingerprint = pipeline_fingerprint() if fingerprint is None else fingerprint
+        self.touch_interval = touch_interval
+        self.hits = self.misses = 0
+        self._conn = None
+        # Held around every use of the connection, reentrant since put reads the size.
+        self._lock = threading.RLock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """
+        The connection of this process, opened on first use. Callers other than the methods of the cache
+        hold ``_lock`` while they use it.
+        """
+        if self._conn is not None:
+            return self._conn
+        with self._lock:
+            if self._conn is not None:
+                return self._conn
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=60, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS results ('
+                         'key TEXT PRIMARY KEY, value BLOB, size INTEGER, '
+                         'accessed REAL, fingerprint TEXT)')
+            conn.execute('CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)')
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)')
+            with self._transaction(conn):
+                if conn.execute("SELECT value FROM meta WHERE name = 'size'").fetchone() is None:
+                    # A database of an older version.
+                    conn.execute("INSERT INTO meta SELECT 'size', COALESCE(SUM(size), 0) FROM results")
+            # Only set once the tables exist, the check above reads it without the lock.
+            self._conn = conn
+            return conn
+
+    @contextmanager
+    def _transaction(self, conn: Optional[sqlite3.Connection] = None):
+        conn = conn or self.conn
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def key(self, *parts: bytes) -> str:
+        """
+        Cache key of an input made of ``parts``, under the current fingerprint.
+        """
+        sha = hashlib.sha256(self.fingerprint.encode())
+        for part in parts:
+            sha.update(len(part).to_bytes(8, 'little'))
+            sha.update(part)
+        return sha.hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Returns:
+            The stored value, or None on a miss.
+        """
+        with self._lock:
+            row = self.conn.execute('SELECT value, accessed FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                count(cache_misses=1)
+                return None
+            self.hits += 1
+            count(cache_hits=1)
+            now = time.time()
+            if now - row[1] >= self.touch_interval:
+                self.conn.execute('UPDATE results SET accessed = ? WHERE key = ?', (now, key))
+        return pickle.loads(row[0])
+
+    def put(self, key: str, value: Any):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_size:
+            log.warning('Result of %d bytes is larger than the cache, not stored.', len(blob))
+            return
+        with self._lock, self._transaction():
+            conn = self.conn
+            row = conn.execute('SELECT size FROM results WHERE key = ?', (key,)).fetchone()
+            conn.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)',
+                         (key, blob, len(blob), time.time(), self.fingerprint))
+            growth = len(blob) - (row[0] if row else 0)
+            conn.execute("UPDATE meta SET value = value + ? WHERE name = 'size'", (growth,))
+            if self.size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        total = self.size
+        while total > self.max_size:
+            oldest = self.conn.execute('SELECT key, size FROM results ORDER BY accessed LIMIT 64').fetchall()
+            if not oldest:
+                total = 0
+                break
+            for key, size in oldest:
+                self.conn.execute('DELETE FROM results WHERE key = ?', (key,))
+                total -= size
+                if total <= self.max_size:
+                    break
+        self.conn.execute("UPDATE meta SET value = ? WHERE name = 'size'", (total,))
+
+    def invalidate(self, stale_only: bool = False) -> int:
+        """
+        Remove cached results, e.g. after the rules have been changed.
+
+        Args:
+            stale_only (bool): Only remove results cached under another fingerprint.
+
+        Returns:
+            The number of removed results.
+        """
+        with self._lock:
+            conn = self.conn
+            with self._transaction():
+                if stale_only:
+                    cursor = conn.execute('DELETE FROM results WHERE fingerprint != ?', (self.fingerprint,))
+                else:
+                    cursor = conn.execute('DELETE FROM results')
+                conn.execute("UPDATE meta SET value = (SELECT COALESCE(SUM(size), 0) FROM results) "
+                             "WHERE name = 'size'")
+            conn.execute('VACUUM')
+            return cursor.rowcount
+
+    @property
+    def size(self) -> int:
+        """Total size of the stored values in bytes."""
+        with self._lock:
+            return self.conn.execute("SELECT value FROM meta WHERE name = 'size'").fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.,
+                'entries': len(self),
+                'size': self.size}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_conn'] = state['_lock'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+
+class TagCache:
+    """
+    Tags of sentences keyed by a hash of the tagger version and the sentence text, so sentences that recur
+    across papers (e.g. the methods of coin cell tests) are tagged once.
+
+    The most recently used entries are kept in memory. With a ``path``, every entry is also stored in
+    a ``ResultCache`` on disk that the worker processes share. Pickling keeps the disk tier only.
+    Safe to share between threads.
+    """
+
+    def __init__(self, max_entries: int = 100000, path: Optional[str] = None, max_size: int = 2 ** 28):
+        """
+        Args:
+            max_entries (int): Sentences kept in memory.
+            path (str): SQLite database file of the disk tier, none if None.
+            max_size (int): Maximum size of the disk tier in bytes. Defaults to 256 MiB.
+        """
+        self.max_entries = max_entries
+        self.memory: OrderedDict = OrderedDict()
+        # Sentences are small and looked up often, their access time is updated at most hourly.
+        self.disk = None if path is None else ResultCache(path, max_size, fingerprint='tags', touch_interval=3600)
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(version: str, text: str) -> str:
+        """
+        Cache key of the sentence ``text`` tagged by the tagger ``version``.
+        """
+        sha = hashlib.sha256(version.encode('utf-8'))
+        sha.update(b'\0')
+        sha.update(text.encode('utf-8', 'surrogatepass'))
+        return sha.hexdigest()
+
+    def get(self, key: str) -> Optional[List[Any]]:
+        """
+        Returns:
+            The tags of the tokens of the sentence, or None on a miss.
+        """
+        with self._lock:
+            tags = self.memory.get(key)
+            if tags is not None:
+                self.memory.move_to_end(key)
+                count(cache_hits=1)
+        if tags is None and self.disk is not None:
+            tags = self.disk.get(key)
+            if tags is not None:
+                self._remember(key, tags)
+        with self._lock:
+            if tags is None:
+                self.misses += 1
+                if self.disk is None:
+                    count(cache_misses=1)
+            else:
+                self.hits += 1
+        return tags
+
+    def put(self, key: str, tags: List[Any]):
+        self._remember(key, tags)
+        if self.disk is not None:
+            self.disk.put(key, tags)
+
+    def _remember(self, key: str, tags: List[Any]):
+        with self._lock:
+            self.memory[key] = tags
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.max_entries:
+                self.memory.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.
+
+    def stats(self) -> dict:
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hit_rate,
+                'entries': len(self.memory),
+                'disk': None if self.disk is None else self.disk.stats()}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['memory'] = OrderedDict()
+        state['hits'] = state['misses'] = 0
+        state['_lock'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class LRUCache:
+    """
+    In-memory cache of at most ``max_entries`` values, evicting the least recently used one, with hit and
+    miss counts. Safe to share between threads.
+    """
+
+    def __init__(self, max_entries: int = 2 ** 14):
+        """
+        Args:
+            max_entries (int): Values kept, None for no limit.
+        """
+        self.max_entries = max_entries
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            try:
+                value = self.entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            self._evict()
+
+    def resize(self, max_entries: int):
+        with self._lock:
+            self.max_entries = max_entries
+            self._evict()
+
+    def _evict(self):
+        if self.max_entries is not None:
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.
+
+    def stats(self) -> dict:
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hit_rate,
+                'entries': len(self.entries),
+                'max_entries': self.max_entries}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['entries'] = OrderedDict()
+        state['hits'] = state['misses'] = 0
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
@@ -0,0 +1,184 @@
+# coding=utf-8
+"""
+Command-line interface.
+
+    cathodedataextractor extract papers/ --workers 8 --output records.jsonl --resume
+    cathodedataextractor extract papers/ --shard 0/4 --output shard0.jsonl
+    cathodedataextractor merge shard*.jsonl --output records.jsonl --inputs papers/
+"""
+import os
+import sys
+import glob
+import time
+import argparse
+from typing import List, Tuple, Iterable
+
+from . import configure_logging
+from .cache import TagCache
+from .information_extraction_pipe import Pipeline
+from .manifest import Manifest
+from .nlp import CEM_MODES, ChemPrefilter
+from .sharding import shard_paths, merge_shards
+from .sinks import SINKS, sink_type, open_sink
+from .stats import CorpusStats
+from .threads import default_threads, set_threads
+
+__all__ = ['main']
+
+DOCUMENT_SUFFIXES = ('.xml', '.html', '.htm')
+
+
+def expand_inputs(specs: Iterable[str]) -> List[str]:
+    """
+    Document paths of directories, glob patterns, '@' prefixed files listing one path per line, or paths.
+    """
+    paths = []
+    for spec in specs:
+        if spec.startswith('@'):
+            with open(spec[1:], encoding='utf-8') as f:
+                paths.extend(line.strip() for line in f if line.strip())
+        elif os.path.isdir(spec):
+            paths.extend(sorted(os.path.join(root, name)
+                                for root, _, names in os.walk(spec)
+                                for name in names if name.lower().endswith(DOCUMENT_SUFFIXES)))
+        elif glob.has_magic(spec):
+            paths.extend(sorted(glob.glob(spec, recursive=True)))
+        else:
+            paths.append(spec)
+    return list(dict.fromkeys(paths))
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    try:
+        index, count = (int(_) for _ in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError('expected i/n, e.g. 0/4')
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError('shard index must be in [0, n)')
+    return index, count
+
+
+class Progress(CorpusStats):
+    """
+    Prints the live throughput to stderr.
+    """
+
+    def __init__(self, total: int, interval: float = 1.):
+        super().__init__()
+        self.total, self.interval = total, interval
+        self.last = 0.
+
+    def on_document(self, output):
+        super().on_document(output)
+        now = time.perf_counter()
+        if now - self.last >= self.interval or self.documents == self.total:
+            self.last = now
+            sys.stderr.write('\r' + self.status())
+            sys.stderr.flush()
+
+    def status(self) -> str:
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        sentences = self.stages.get('text_processing', {}).get('sentences', 0)
+        return '{}/{} documents, {} failed, {:.2f} docs/s, {:.1f} sentences/s'.format(
+            self.documents, self.total, self.failed, self.documents / elapsed, sentences / elapsed)
+
+
+def extract(args) -> int:
+    paths = expand_inputs(args.inputs)
+    if args.shard:
+        paths = list(shard_paths(paths, *args.shard))
+
+    manifest = None
+    manifest_path = args.manifest or (None if args.output == '-' else args.output + '.manifest.jsonl')
+    if args.resume and manifest_path is None:
+        sys.exit('--resume needs --output or --manifest')
+    if args.resume and not sink_type(args.output, args.format).resumable:
+        sys.exit('--resume cannot append to {}, write to a new file or use jsonl or csv'.format(args.output))
+    if manifest_path is not None:
+        if not args.resume and os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        manifest = Manifest(manifest_path, location=args.output)
+        paths = [path for path in paths if path not in manifest]
+
+    try:
+        sink = open_sink(args.output, args.format, append=args.resume)
+    except (ImportError, ValueError) as e:
+        sys.exit(str(e))
+
+    threads = None
+    if args.threads:
+        threads = default_threads(args.workers)._replace(intra_op=args.threads)
+        if args.workers <= 1:
+            # The documents run in this process.
+            set_threads(threads)
+    progress = Progress(len(paths))
+    # This process only feeds the workers, so it may load the models for them to share.
+    pipeline = Pipeline(hooks=[progress], timeout=args.timeout_per_doc, preload=args.workers > 1,
+                        max_rss=args.max_rss_mb << 20 if args.max_rss_mb else None, mode=args.mode,
+                        tag_cache=TagCache(path=args.tag_cache) if args.tag_cache else None,
+                        prefilter=ChemPrefilter(args.prefilter) if args.prefilter else None, threads=threads)
+    with sink:
+        for output in pipeline.iter_extract(paths, workers=args.workers, manifest=manifest):
+            sink.write(output)
+    sys.stderr.write('\n' + progress.report() + '\n')
+    return 0
+
+
+def merge(args) -> int:
+    inputs = [path for spec in args.shards for path in (sorted(glob.glob(spec)) if glob.has_magic(spec) else [spec])]
+    report = merge_shards(inputs, args.output, expand_inputs(args.inputs) if args.inputs else None)
+    sys.stderr.write(str(report) + '\n')
+    return 0 if report.ok else 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='cathodedataextractor')
+    parser.add_argument('--log-file', default='clog.txt', help="Log file, appended to. '' for none.")
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    ext = commands.add_parser('extract', help='Extract records from Xml or Html documents.')
+    ext.add_argument('inputs', nargs='+', help='Directories, glob patterns, @file lists or document paths. '
+                                               'Files must be named after their doi, as for Pipeline.extract.')
+    ext.add_argument('-w', '--workers', type=int, default=1, help='Worker processes, each loads the models once.')
+    ext.add_argument('--shard', type=parse_shard, help='Only process shard i of n, e.g. 0/4. '
+                                                       'Documents are assigned by a stable hash of their doi.')
+    ext.add_argument('-o', '--output', default='-', help="Output file, '-' (default) for JSONL to stdout.")
+    ext.add_argument('-f', '--format', choices=sorted(SINKS), help='Output format, taken from the extension if not given.')
+    ext.add_argument('--manifest', help='Manifest of finished documents, defaults to OUTPUT.manifest.jsonl.')
+    ext.add_argument('--resume', action='store_true', help='Skip the documents in the manifest and append to OUTPUT.')
+    ext.add_argument('--timeout-per-doc', type=float, help='Kill and replace a worker stuck on a document for '
+                                                           'this many seconds, the document is recorded as failed.')
+    ext.add_argument('--max-rss-mb', type=int, help='Kill and replace a worker whose resident memory exceeds '
+                                                    'this many MB, the document is recorded as failed.')
+    ext.add_argument('--mode', choices=sorted(CEM_MODES), default='bert',
+                     help="CEM tagging. 'onnx' runs BERT with int8 weights in ONNX Runtime (needs onnxruntime), "
+                          "'rules' skips the BERT tagger, many times faster at a lower recall.")
+    ext.add_argument('--tag-cache', help='SQLite file caching the CEM tags of sentences, shared by the workers '
+                                         'and across runs. Sentences seen before are not tagged again.')
+    ext.add_argument('--prefilter', type=int, nargs='?', const=1, metavar='THRESHOLD',
+                     help='Skip the BERT tagger on sentences with fewer than THRESHOLD (default 1) chemical-looking '
+                          'tokens, they get no CEMs. See benchmarks/prefilter_recall.py for the recall.')
+    ext.add_argument('--threads', type=int, help='Intra-op threads of torch and ONNX Runtime in each worker. '
+                                                 'Defaults to the CPUs divided by the workers, see '
+                                                 'benchmarks/thread_scaling.py to tune it.')
+    ext.set_defaults(func=extract)
+
+    mer = commands.add_parser('merge', help='Merge the JSONL outputs of shards into one dataset ordered by doi.')
+    mer.add_argument('shards', nargs='+', help='JSONL outputs of the shards, or glob patterns.')
+    mer.add_argument('-o', '--output', required=True, help='Merged JSONL file.')
+    mer.add_argument('--inputs', nargs='+', help='Input documents of all the shards (as for extract), to check that '
+                                                 'each was processed exactly once. Exits with 1 if not.')
+    mer.set_defaults(func=merge)
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.log_file:
+        configure_logging(args.log_file)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,19 +2,35 @@
 """
 Information extraction pipeline.
 """
+import gc
 import os
 import csv
+import logging
+import multiprocessing
 from pathlib import Path
-from typing import List, Dict, Tuple, Union, Optional, NamedTuple
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Tuple, Union, Optional, NamedTuple, Iterable, Iterator
 
 from .parse import PARAGRAPH_SEPARATOR, ATTRIBUTE_PROMPT, BACKSLASH_REPLACEMENT
 from .parse.relation_extraction import PropertyParse
-from .nlp import LText, AbbreviationDetection
+from .nlp import LText, AbbreviationDetection, ChemPrefilter, warmup, cem_mode, CEM_MODES, using_tag_cache, \
+    using_prefilter
+from .nlp.cner import material_parser
 from .text import TagClassificationPar2Text, BatteriesTextProcessor
 from .relationextractpostprocessing import data_pprocess
+from .cache import ResultCache, TagCache
+from .stats import stage, recording, merge, PipelineHook
+from .manifest import Manifest
+from .staged import Stage, StagedExecutor
+from .supervisor import SupervisedPool, WorkerFailure, StageReporter, uss
+from .threads import ThreadConfig, default_threads, set_threads
 from .utils import write_into_json, write_csv
 
-__all__ = ['Pipeline']
+__all__ = ['Pipeline', 'preload']
+
+log = logging.getLogger(__name__)
 
 
 class PipelineData(NamedTuple):
@@ -31,6 +47,14 @@ class PipelineData(NamedTuple):
     stoichiometric_variables_chem: Union[dict, Dict[str, List[int]]] = {}
 
 
+class PipelineDocument(NamedTuple):
+    """
+    Passages tagged while preprocessing, shared by the later stages so that every sentence is tagged only once.
+    """
+    experiment: LText = None
+    property_text: List[LText] = []
+
+
 class PipelineOutputData(NamedTuple):
     """
     Information extraction pipeline output data types.
@@ -40,30 +64,167 @@ class PipelineOutputData(NamedTuple):
     relation_extract_res: List[dict] = ''
     post_relation_extract_res: List[dict] = ''
 
+    path: Optional[str] = None
+    error: Optional[str] = None
+    stats: Optional[Dict[str, Dict[str, float]]] = None
+
 
 PATH = Path(__file__).absolute().parent.parent
 
 
 class Pipeline:
 
-    def __init__(self, data_info=None):
+    def __init__(self, data_info=None, cache: Optional[ResultCache] = None,
+                 hooks: Optional[List[PipelineHook]] = None, timeout: Optional[float] = None,
+                 max_rss: Optional[int] = None, preload: bool = False, mode: str = 'bert',
+                 tag_cache: Optional[TagCache] = None, prefilter: Optional[ChemPrefilter] = None,
+                 threads: Optional[ThreadConfig] = None):
+        """
+        Args:
+            data_info (dict): Doi to labels.
+            cache (ResultCache): Where results of ``extract`` are cached, no caching if None.
+            hooks (List[PipelineHook]): Callbacks of stages and documents. ``on_stage`` is only called
+                for the stages run in this process, ``on_document`` for every document.
+            timeout (float): Seconds a document may take in ``iter_extract`` and ``extract_many``.
+            max_rss (int): Resident memory in bytes a worker of ``iter_extract`` and ``extract_many`` may use.
+                With either limit set, documents run in supervised worker processes. A worker that breaches
+                a limit is killed and replaced, and its document fails with the reason and the stage it was in.
+            preload (bool): Load the models once before starting worker processes, so the workers share them
+                copy-on-write instead of each loading its own copy. See ``preload``. With the fork start method
+                this loads and runs the models in this process, so it is off by default for library use.
+            mode (str): CEM tagging, 'bert', 'onnx' or 'rules'. 'onnx' runs BERT with int8 weights in ONNX Runtime
+                on the CPU (needs onnxruntime). 'rules' uses the CRF and dictionary taggers instead of the BERT
+                tagger, many times faster at a lower recall, e.g. for triage of large corpora.
+            tag_cache (TagCache): Where the CEM tags of sentences are cached while this pipeline extracts,
+                in this process and the workers. Sentences that recur across documents are tagged once.
+                No caching if None.
+            prefilter (ChemPrefilter): Sentences it finds nothing chemical in skip the BERT tagger and get
+                no CEMs while this pipeline extracts, in this process and the workers. Every sentence is tagged
+                if None.
+            threads (ThreadConfig): Threads of torch, ONNX Runtime and the tokenizers in each worker process of
+                ``iter_extract`` and ``extract_many``. If None, the workers split the cores evenly, see
+                ``default_threads``. This process is left alone, see ``threads.set_threads`` for it.
+        """
+        if mode not in CEM_MODES:
+            raise ValueError('Unknown mode {!r}, expected one of {}.'.format(mode, sorted(CEM_MODES)))
         self.doi2labels = {} if data_info is None else data_info
+        self.cache = cache
+        self.hooks = [] if hooks is None else list(hooks)
+        self.timeout = timeout
+        self.max_rss = max_rss
+        self.preload = preload
+        self.mode = mode
+        self.tag_cache = tag_cache
+        self.prefilter = prefilter
+        self.threads = threads
+
+    @staticmethod
+    def from_string(text: str, cache: Optional[ResultCache] = None, mode: str = 'bert'):
+        """
+        Same as ``Pipeline(cache=cache, mode=mode).extract_string(text)``.
+
+        Args:
+            text (str): Text to extract from.
+            cache (ResultCache): Where the result is cached, no caching if None.
+            mode (str): CEM tagging, as for ``Pipeline``.
+        """
+        return Pipeline(cache=cache, mode=mode).extract_string(text)
 
     @staticmethod
-    def from_string(text: str):
+    def from_strings(texts: Iterable[str], batch_size: int = 64, cache: Optional[ResultCache] = None,
+                     mode: str = 'bert') -> List[PipelineOutputData]:
+        """
+        Same as ``Pipeline(cache=cache, mode=mode).extract_strings(texts, batch_size)``.
+
+        Args:
+            texts (Iterable[str]): Texts to extract from.
+            batch_size (int): Number of texts whose sentences are tagged together.
+            cache (ResultCache): Where the results are cached, no caching if None.
+            mode (str): CEM tagging, as for ``Pipeline``.
+        """
+        return Pipeline(cache=cache, mode=mode).extract_strings(texts, batch_size)
+
+    def extract_string(self, text: str) -> PipelineOutputData:
+        """
+        Extract from a text instead of a document, with the cache, mode, tag cache, prefilter and hooks
+        of this pipeline.
+
+        Args:
+            text (str): Text to extract from.
+        """
+        with recording(self.hooks) as recorder, self._tagging():
+            key, output = self._string_lookup(text)
+            if output is None:
+                output = self._from_string(text)
+                if key is not None:
+                    self.cache.put(key, output)
+        output = output._replace(stats=recorder.as_dict())
+        self._notify(output)
+        return output
+
+    def extract_strings(self, texts: Iterable[str], batch_size: int = 64) -> List[PipelineOutputData]:
+        """
+        Same as ``extract_string`` on each text, but the sentences of up to ``batch_size`` texts are
+        tagged together in shared batches instead of one short sentence at a time.
 
-        bat_doc = BatteriesTextProcessor(text, special_normal=True)
+        Args:
+            texts (Iterable[str]): Texts to extract from.
+            batch_size (int): Number of texts whose sentences are tagged together.
+
+        Returns:
+            A list of ``PipelineOutputData`` in input order. The shared tagging is not part of their ``stats``.
+        """
+        texts = list(texts)
+        outputs: List[Optional[PipelineOutputData]] = [None] * len(texts)
+        keys: List[Optional[str]] = [None] * len(texts)
+        lookups: List[dict] = [{}] * len(texts)
+        if self.cache is not None:
+            for i, text in enumerate(texts):
+                with recording(self.hooks) as recorder:
+                    keys[i], outputs[i] = self._string_lookup(text)
+                lookups[i] = recorder.as_dict()
+                if outputs[i] is not None:
+                    outputs[i] = outputs[i]._replace(stats=lookups[i])
+
+        todo = [i for i, output in enumerate(outputs) if output is None]
+        with self._tagging():
+            for start in range(0, len(todo), max(batch_size, 1)):
+                chunk = todo[start:start + max(batch_size, 1)]
+                processors = BatteriesTextProcessor.from_texts([texts[i] for i in chunk], special_normal=True)
+                for i, bat_doc in zip(chunk, processors):
+                    with recording(self.hooks) as recorder:
+                        output = self._from_processed(bat_doc)
+                    if keys[i] is not None:
+                        self.cache.put(keys[i], output)
+                    outputs[i] = output._replace(stats=merge(recorder.as_dict(), lookups[i]))
+        for output in outputs:
+            self._notify(output)
+        return outputs
+
+    def _string_lookup(self, text: str) -> Tuple[Optional[str], Optional[PipelineOutputData]]:
+        if self.cache is None:
+            return None, None
+        with stage('cache'):
+            key = self.cache.key(b'string', self.mode.encode('utf-8'), text.encode('utf-8', 'surrogatepass'))
+            return key, self.cache.get(key)
+
+    @staticmethod
+    def _from_string(text: str) -> PipelineOutputData:
+        return Pipeline._from_processed(BatteriesTextProcessor(text, special_normal=True))
 
+    @staticmethod
+    def _from_processed(bat_doc: BatteriesTextProcessor) -> PipelineOutputData:
         AbbreviationDetection.ner = bat_doc.ner
         abbreviation_detection = AbbreviationDetection()
         processed_text = ' '.join(bat_doc.processed_text)
-        abbreviation_detection = abbreviation_detection(processed_text)
+        ltext = bat_doc.to_ltext()
+        abbreviation_detection = abbreviation_detection(ltext)
 
         prep_data = PipelineData(property_text=processed_text,
                                  abbreviation=abbreviation_detection.new_abbreviation,
                                  stoichiometric_variables_chem=abbreviation_detection.stoichiometric_variables_chem)
 
-        pp: PropertyParse = Pipeline._relation_extract(prep_data)
+        pp: PropertyParse = Pipeline._relation_extract(prep_data, PipelineDocument(ltext, [ltext]))
         for j in pp.results:
             if pp.current_define:
                 j['Current_define'] = pp.current_define
@@ -84,7 +245,41 @@ class Pipeline:
         Args:
             path (str): Document (Xml or Html) file path.
         """
+        output = self._run(path)
+        self._notify(output)
+        return output
 
+    @contextmanager
+    def _tagging(self):
+        """
+        The CEM mode, tag cache and prefilter of this pipeline, for the current thread inside the block.
+        """
+        with cem_mode(self.mode), using_tag_cache(self.tag_cache), using_prefilter(self.prefilter):
+            yield
+
+    def _run(self, path: str) -> PipelineOutputData:
+        with recording(self.hooks) as recorder, self._tagging():
+            key, output = self._cache_lookup(path)
+            if output is None:
+                output = self._extract(path)
+                if key is not None:
+                    self.cache.put(key, output)
+        return output._replace(path=path, stats=recorder.as_dict())
+
+    def _cache_lookup(self, path: str) -> Tuple[Optional[str], Optional[PipelineOutputData]]:
+        if self.cache is None:
+            return None, None
+        with stage('cache'):
+            # The doi is taken from the file name, so it is part of the input.
+            key = self.cache.key(b'file', self.mode.encode('utf-8'),
+                                 os.path.basename(path).encode('utf-8', 'surrogateescape'), Path(path).read_bytes())
+            return key, self.cache.get(key)
+
+    def _notify(self, output: PipelineOutputData):
+        for hook in self.hooks:
+            hook.on_document(output)
+
+    def _extract(self, path: str) -> PipelineOutputData:
         head, tail = os.path.split(path)
 
         """
@@ -95,12 +290,16 @@ class Pipeline:
         """
         Text preprocessing and chemical supplementary information extraction (CSIE).
         """
-        prep_data: PipelineData = self._preprocess_csie(data)
+        prep_data, document = self._preprocess_csie(data)
 
         """
         Named entity recognition (NER) and relation extraction.
         """
-        pp: PropertyParse = self._relation_extract(prep_data)
+        return self._relation_output(data, prep_data, document)
+
+    def _relation_output(self, data: PipelineData, prep_data: PipelineData,
+                         document: PipelineDocument) -> PipelineOutputData:
+        pp: PropertyParse = self._relation_extract(prep_data, document)
         for j in pp.results:
             if pp.current_define:
                 j['Current_define'] = pp.current_define
@@ -113,7 +312,198 @@ class Pipeline:
                                   relation_extract_res=pp.results,
                                   post_relation_extract_res=final_records)
 
+    def extract_many(self, paths: Iterable[str], workers: Optional[int] = None,
+                     ordered: bool = True) -> List[PipelineOutputData]:
+        """
+        Extract a batch of documents with a pool of worker processes.
+
+        Every worker builds its own pipeline once and keeps it for all the documents it is
+        given. With ``preload`` the models are loaded before the workers start. A document that raises is returned
+        as a ``PipelineOutputData`` with ``error`` set, the rest of the batch carries on.
+
+        Args:
+            paths (Iterable[str]): Document (Xml or Html) file paths.
+            workers (int): Number of worker processes. Defaults to the number of CPUs.
+            ordered (bool): Return the results in input order, otherwise in completion order.
+
+        Returns:
+            A list of ``PipelineOutputData``, one for each path.
+        """
+        paths = list(paths)
+        if not paths:
+            return []
+        workers = min(workers or os.cpu_count() or 1, len(paths))
+        return list(self.iter_extract(paths, workers=workers, max_pending=len(paths), ordered=ordered))
+
+    def iter_extract(self, paths: Iterable[str], workers: int = 1, max_pending: Optional[int] = None,
+                     ordered: bool = True, manifest: Optional[Manifest] = None) -> Iterator[PipelineOutputData]:
+        """
+        Extract documents one after another, yielding each result as soon as it is ready.
+
+        ``paths`` is consumed lazily and at most ``max_pending`` documents are in flight
+        at any time, so memory stays bounded however long the input is.
+
+        Args:
+            paths (Iterable[str]): Document (Xml or Html) file paths, may be a generator.
+            workers (int): Number of worker processes, 1 extracts in the current process unless
+                ``timeout`` or ``max_rss`` is set.
+            max_pending (int): Limit of documents submitted but not yet yielded. Defaults to 2 * workers.
+            ordered (bool): Yield the results in input order, otherwise in completion order.
+            manifest (Manifest): Paths it holds are skipped, and each document is recorded in it
+                once the consumer asks for the next result, i.e. after its output has been handled.
+
+        Yields:
+            ``PipelineOutputData`` for each path, with ``error`` set if the document failed.
+        """
+        if manifest is not None:
+            paths = (path for path in paths if path not in manifest)
+        yield from _recorded(self._iter_extract(paths, workers, max_pending, ordered), manifest)
+
+    def _iter_extract(self, paths: Iterable[str], workers: int, max_pending: Optional[int],
+                      ordered: bool) -> Iterator[PipelineOutputData]:
+        if self.timeout or self.max_rss:
+            threads = self._worker_threads(workers)
+            pool = SupervisedPool(workers, initializer=_init_worker,
+                                  initargs=(self.doi2labels, self.cache, [StageReporter()], self.mode,
+                                            self.tag_cache, self.prefilter, threads),
+                                  timeout=self.timeout, max_rss=self.max_rss, context=self._worker_context())
+            for path, output in pool.map(_extract_worker, paths, ordered=ordered):
+                if isinstance(output, WorkerFailure):
+                    output = PipelineOutputData(path=path, error=str(output))
+                self._count_cache(output)
+                self._notify(output)
+                yield output
+            return
+
+        if workers <= 1:
+            for path in paths:
+                output = _safe_extract(self, path)
+                self._notify(output)
+                yield output
+            return
+
+        max_pending = max(max_pending or 2 * workers, 1)
+        threads = self._worker_threads(workers)
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=self._worker_context(),
+                                 initializer=_init_worker,
+                                 initargs=(self.doi2labels, self.cache, None, self.mode,
+                                           self.tag_cache, self.prefilter, threads)) as executor:
+            pending = OrderedDict()
+            try:
+                for path in paths:
+                    pending[executor.submit(_extract_worker, path)] = path
+                    while len(pending) >= max_pending:
+                        yield from self._drain(pending, ordered)
+                while pending:
+                    yield from self._drain(pending, ordered)
+            finally:
+                # Do not wait for documents nobody will consume.
+                for future in pending:
+                    future.cancel()
+
+    def _worker_threads(self, workers: int) -> ThreadConfig:
+        """
+        Threads of each worker, applied by the worker when it starts.
+        """
+        return self.threads or default_threads(workers)
+
+    def _worker_context(self):
+        """
+        Context of the worker processes. Forked workers start from this process with the models preloaded,
+        with the forkserver start method the server preloads them.
+        """
+        ctx = multiprocessing.get_context()
+        if self.preload:
+            if ctx.get_start_method() == 'fork':
+                preload(self.mode)
+            elif ctx.get_start_method() == 'forkserver' and self.mode == 'bert':
+                # The preload module loads the default mode.
+                multiprocessing.set_forkserver_preload([__package__ + '._preload'])
+        return ctx
+
+    def _drain(self, pending: 'OrderedDict', ordered: bool) -> Iterator[PipelineOutputData]:
+        for output in _drain(pending, ordered):
+            self._count_cache(output)
+            self._notify(output)
+            yield output
+
+    def _count_cache(self, output: PipelineOutputData):
+        """
+        Add the lookups a worker made in its copy of the result cache, as its stats recorded them, to ``cache``.
+        """
+        counters = (output.stats or {}).get('cache')
+        if self.cache is not None and counters:
+            self.cache.hits += counters.get('cache_hits', 0)
+            self.cache.misses += counters.get('cache_misses', 0)
+
+    def iter_extract_staged(self, paths: Iterable[str], parse_workers: int = 2, preprocess_workers: int = 1,
+                            relation_workers: int = 1, queue_size: int = 4, ordered: bool = True,
+                            manifest: Optional[Manifest] = None) -> Iterator[PipelineOutputData]:
+        """
+        Extract documents in this process with the stages overlapped: the next documents are parsed
+        while the current one is tagged, and relations of the previous one are extracted meanwhile.
+
+        Each stage has its own threads and a bounded input queue, so a slow stage holds back the ones
+        before it. ``timeout`` and ``max_rss`` are not enforced here, the stages share this process.
+
+        Args:
+            paths (Iterable[str]): Document (Xml or Html) file paths, may be a generator.
+            parse_workers (int): Threads for paragraph classification (BeautifulSoup).
+            preprocess_workers (int): Threads for text processing and tagging. More than one only helps
+                where the tagger releases the GIL.
+            relation_workers (int): Threads for relation extraction and post processing.
+            queue_size (int): Documents waiting in front of each stage at most.
+            ordered (bool): Yield the results in input order, otherwise in completion order.
+            manifest (Manifest): Same as for ``iter_extract``.
+
+        Yields:
+            ``PipelineOutputData`` for each path, with ``error`` set if the document failed.
+        """
+        if manifest is not None:
+            paths = (path for path in paths if path not in manifest)
+        executor = StagedExecutor([Stage('parse', self._parse_stage, parse_workers, queue_size),
+                                   Stage('preprocess', self._preprocess_stage, preprocess_workers, queue_size),
+                                   Stage('relation', self._relation_stage, relation_workers, queue_size)],
+                                  hooks=self.hooks)
+        yield from _recorded(self._staged_outputs(executor.map(paths, ordered=ordered)), manifest)
+
+    def _staged_outputs(self, results) -> Iterator[PipelineOutputData]:
+        for res in results:
+            if res.error is None:
+                output = res.value._replace(path=res.item, stats=res.stats)
+            else:
+                output = PipelineOutputData(path=res.item, stats=res.stats,
+                                            error='{}: {}'.format(type(res.error).__name__, res.error))
+            self._notify(output)
+            yield output
+
+    def _parse_stage(self, path: str):
+        key, output = self._cache_lookup(path)
+        if output is not None:
+            return output
+        head, tail = os.path.split(path)
+        return key, self._collect_corpus(head=head, tail=tail)
+
+    def _preprocess_stage(self, value):
+        if isinstance(value, PipelineOutputData):  # Cached.
+            return value
+        key, data = value
+        with self._tagging():
+            return (key, data) + self._preprocess_csie(data)
+
+    def _relation_stage(self, value) -> PipelineOutputData:
+        if isinstance(value, PipelineOutputData):
+            return value
+        key, data, prep_data, document = value
+        with self._tagging():
+            output = self._relation_output(data, prep_data, document)
+        if key is not None:
+            self.cache.put(key, output)
+        return output
+
     @staticmethod
+    @stage('classification')
     def _collect_corpus(head, tail) -> PipelineData:
 
         TC = TagClassificationPar2Text()
@@ -128,7 +518,8 @@ class Pipeline:
                             )
 
     @staticmethod
-    def _preprocess_csie(data: PipelineData) -> PipelineData:
+    @stage('preprocessing')
+    def _preprocess_csie(data: PipelineData) -> Tuple[PipelineData, PipelineDocument]:
         # preprocess
         year, doi, _intro, _experi, _partial_text = data[:5]
 
@@ -139,22 +530,38 @@ class Pipeline:
         bat_full_text = BatteriesTextProcessor(intro + PARAGRAPH_SEPARATOR + _partial_text, special_normal=True)
 
         experi, partial_text = bat_doc.processed_text, bat_full_text.processed_text
-        ltext = LText(' '.join(partial_text))
-        property_par = '\n'.join([par for par in partial_text[num + 1:]
-                                  if any(_ for _ in ATTRIBUTE_PROMPT if _ in par)])
+        ltext = bat_full_text.to_ltext()
+        property_index = [ind for ind, par in enumerate(partial_text)
+                          if ind > num and any(_ for _ in ATTRIBUTE_PROMPT if _ in par)]
+        property_par = '\n'.join([partial_text[ind] for ind in property_index])
 
         # Chemical abbreviation detection and supplementary information identification
         AbbreviationDetection.ner = bat_full_text.ner
         abbreviation_detection = AbbreviationDetection()
         abbreviation_detection = abbreviation_detection(ltext)
 
+        exp = '\n'.join(experi)
+        document = PipelineDocument(bat_doc.to_ltext(separator='\n') if exp
+                                    else bat_full_text.to_ltext(property_index, separator='\n'),
+                                    [bat_full_text.to_ltext([ind]) for ind in property_index])
+
         return PipelineData(data.year, data.doi,
-                            '\n'.join(partial_text[:num + 1]), '\n'.join(experi), property_par,
+                            '\n'.join(partial_text[:num + 1]), exp, property_par,
                             abbreviation_detection.new_abbreviation,
-                            abbreviation_detection.stoichiometric_variables_chem)
+                            abbreviation_detection.stoichiometric_variables_chem), document
 
     @staticmethod
-    def _relation_extract(data: PipelineData) -> PropertyParse:
+    @stage('relation_extraction')
+    def _relation_extract(data: PipelineData, document: Optional[PipelineDocument] = None) -> PropertyParse:
+        """
+        Args:
+            data (PipelineData): Preprocessed data.
+            document (PipelineDocument): Passages already tagged for data, as ``_preprocess_csie`` returns.
+                Without it the passages are rebuilt from the text of data, and only their sentences that pass
+                the keyword checks of the extraction are tagged in batches. ``extract``, ``iter_extract``,
+                ``iter_extract_staged`` and ``from_string`` always pass the document, whose sentences the text
+                processing has all tagged for the formula normalisation, so the gating saves nothing there.
+        """
 
         year, doi, _, exp, property_text, abb_che, stoichiometric_variable = data
 
@@ -163,10 +570,95 @@ class Pipeline:
                            year=year,
                            stoichiometric_variable=stoichiometric_variable)
         # Experimental parameter relation extraction
-        pp.experimental_extraction(LText(property_text if not exp else exp))
+        if document is None:
+            document = PipelineDocument(LText(property_text if not exp else exp, trigger=pp.experiment_trigger),
+                                        [LText(full_par, trigger=pp.property_trigger)
+                                         for full_par in property_text.split('\n')])
+        pp.experimental_extraction(document.experiment)
 
         # Property relation extraction
-        full_text_par = property_text.split('\n')
-        for full_par in full_text_par:
-            pp.property_extraction(LText(full_par))
+        for full_par in document.property_text:
+            pp.property_extraction(full_par)
         return pp
+
+
+"""
+Worker process side of Pipeline.extract_many.
+"""
+_worker_pipeline: Optional[Pipeline] = None
+
+
+_preloaded = set()
+
+
+def preload(mode: str = 'bert'):
+    """
+    Load the CEM taggers of ``mode`` and the material parser in this process, once per mode. Worker processes
+    forked afterwards share the loaded models copy-on-write; each worker excludes the inherited objects
+    from garbage collection when it starts, so the collector does not write to their pages.
+    """
+    if mode in _preloaded:
+        return
+    warmup(mode)
+    material_parser()
+    _preloaded.add(mode)
+
+
+def _init_worker(data_info, cache=None, hooks=None, mode='bert', tag_cache=None, prefilter=None, threads=None):
+    global _worker_pipeline
+    # Objects inherited from the parent stay shared copy-on-write, harmless in spawned workers.
+    gc.freeze()
+    if threads is not None:
+        # Before anything runs the models, torch sets the inter-op threads only once per process.
+        set_threads(threads)
+    _worker_pipeline = Pipeline(data_info, cache=cache, hooks=hooks, mode=mode, tag_cache=tag_cache,
+                                prefilter=prefilter, threads=threads)
+    # Load the model before the first document rather than during it, a no-op if preloaded.
+    warmup(mode)
+    used = uss(os.getpid())
+    if used is not None:
+        log.info('Worker %d ready, %d MB unique memory', os.getpid(), used >> 20)
+
+
+def _extract_worker(path: str) -> PipelineOutputData:
+    return _safe_extract(_worker_pipeline, path)
+
+
+def _safe_extract(pipeline: Pipeline, path: str) -> PipelineOutputData:
+    try:
+        return pipeline._run(path)
+    except Exception as e:
+        log.exception('Extraction failed: %s', path)
+        return PipelineOutputData(path=path, error='{}: {}'.format(type(e).__name__, e))
+
+
+def _recorded(outputs: Iterable[PipelineOutputData], manifest: Optional[Manifest]) -> Iterator[PipelineOutputData]:
+    """
+    Record each output in the manifest once the consumer asks for the next one.
+    """
+    for output in outputs:
+        yield output
+        if manifest is not None:
+            manifest.record(output.path, error=output.error,
+                            sha256=None if output.error else Manifest.digest(output.post_relation_extract_res))
+
+
+def _drain(pending: 'OrderedDict', ordered: bool) -> Iterator[PipelineOutputData]:
+    """
+    Yield the oldest pending result, or every result that has completed.
+    """
+    if ordered:
+        future, path = pending.popitem(last=False)
+        yield _future_result(future, path)
+        return
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        yield _future_result(future, pending.pop(future))
+
+
+def _future_result(future, path: str) -> PipelineOutputData:
+    try:
+        return future.result()
+    except Exception as e:  # The worker itself died, e.g. BrokenProcessPool.
+        log.error('Worker failed on %s: %s', path, e)
+        return PipelineOutputData(path=path, error='{}: {}'.format(type(e).__name__, e))
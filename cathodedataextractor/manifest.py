@@ -0,0 +1,117 @@
+# coding=utf-8
+"""
+Append-only manifest of finished documents, for resuming long batch runs.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+from typing import Optional, Set
+
+try:
+    import fcntl
+except ImportError:  # Windows, appends are still made with one write each.
+    fcntl = None
+
+__all__ = ['Manifest']
+
+log = logging.getLogger(__name__)
+
+
+class Manifest:
+    """
+    JSON Lines record of the documents a batch has finished, one line per document.
+
+    Each line is written with a single ``O_APPEND`` write under an exclusive ``flock``, so several
+    processes can share one manifest. The finished inputs are read once, and looking one up is a set lookup.
+    """
+
+    def __init__(self, path: str, location: Optional[str] = None):
+        """
+        Args:
+            path (str): Manifest file, created if it does not exist.
+            location (str): Default output location recorded with each document.
+        """
+        self.path = str(path)
+        self.location = location
+        self._completed: Optional[Set[str]] = None
+
+    @staticmethod
+    def key(path: str) -> str:
+        return os.path.abspath(path)
+
+    @property
+    def completed(self) -> Set[str]:
+        """Keys of the documents finished without an error."""
+        if self._completed is None:
+            self._completed = set()
+            if os.path.exists(self.path):
+                self._terminate_last_line()
+                with open(self.path, encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:  # A line cut short by a crash.
+                            log.warning('Skipping malformed manifest line: %r', line)
+                            continue
+                        if not entry.get('error'):
+                            self._completed.add(entry['key'])
+        return self._completed
+
+    def _terminate_last_line(self):
+        """
+        End a line cut short by a crash, so that the next record does not run into it.
+        """
+        with open(self.path, 'rb+') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0, os.SEEK_END)
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    f.write(b'\n')
+
+    def __contains__(self, path: str) -> bool:
+        return self.key(path) in self.completed
+
+    def __len__(self):
+        return len(self.completed)
+
+    def record(self, path: str, location: Optional[str] = None, sha256: Optional[str] = None,
+               error: Optional[str] = None, **extra):
+        """
+        Append a finished document. Documents recorded with an error are not counted as finished.
+
+        Args:
+            path (str): Input document.
+            location (str): Where its output was written, defaults to ``self.location``.
+            sha256 (str): Hash of its output.
+            error (str): Why the document failed.
+        """
+        key = self.key(path)
+        completed = self.completed
+        entry = {'key': key, 'location': self.location if location is None else location,
+                 'sha256': sha256, 'error': error, 'time': time.time()}
+        entry.update(extra)
+        line = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            os.write(fd, line)
+            os.fsync(fd)
+        finally:
+            os.close(fd)  # Also releases the lock.
+
+        if not error:
+            completed.add(key)
+
+    @staticmethod
+    def digest(data) -> str:
+        """
+        sha256 of the JSON form of ``data``.
+        """
+        return hashlib.sha256(json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+                              .encode('utf-8')).hexdigest()
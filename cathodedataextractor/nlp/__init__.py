@@ -1,5 +1,7 @@
 # coding=utf-8
 from .cner import CNer
 from .abbrev import AbbreviationDetection
-from .cdetext import LText
+from .cdetext import LText, tokenize_sentences, tag_sentences, warmup, cem_mode, CEM_MODES, \
+    set_tag_cache, get_tag_cache, using_tag_cache, set_prefilter, get_prefilter, using_prefilter
+from .prefilter import ChemPrefilter
 from .tokenizer4units import UnitsTokenizer, units_tokenizer
@@ -8,9 +8,8 @@ from collections import Counter
 from functools import partial, lru_cache
 
 import regex as re
-from pymatgen.core.periodic_table import _pt_data
 
-from .cner import CNer
+from .cner import CNer, periodic_table
 from .cdetext import LText
 from .tokenizer4units import units_tokenizer as tokenizer
 
@@ -23,6 +22,7 @@ from ..parse import (
     ignore_suffix_pattern
 )
 from ..utils import any_func, if_num_dot
+from ..stats import stage, count
 
 
 log = logging.getLogger(__name__)
@@ -209,9 +209,10 @@ class AbbreviationDetection:
                 syns_m.update({iterm[0]: str(round(eval(iterm[1]) / facter, position))})
             else:
                 syns_m.update({iterm[0]: ''})
+        pt_data = periodic_table()
         for m in res_dict_m['elements_x']['M']:
             syns_m.update({m: m_value})
-            sort_ = sorted(syns_m.items(), key=lambda s: _pt_data[s[0]]['IUPAC ordering'])
+            sort_ = sorted(syns_m.items(), key=lambda s: pt_data[s[0]]['IUPAC ordering'])
             synthetic.append(res_dict_m['phase'] + '-' + ''.join([_[0] + _[1] for _ in sort_]))
             del syns_m[m]
         return synthetic
@@ -362,6 +363,7 @@ class AbbreviationDetection:
         # Determines whether the parts spaced by '-' are satisfied.
         return any(func_p(abb) for abb in p_abb[1].split('-'))
 
+    @stage('abbreviation_detection')
     def __call__(self, obj: Union[LText, str]):
         if isinstance(obj, str):
             obj = LText(obj)
@@ -369,6 +371,7 @@ class AbbreviationDetection:
         for num_s, find_cem in enumerate(obj.sentences):
             s_start, s_end = find_cem.start, find_cem.end
             _cem = find_cem.cems
+            count(sentences=1, cems=len(_cem))
 
             break_fg = False
             s_abb, s_synthetic = [], []
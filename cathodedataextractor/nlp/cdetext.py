@@ -2,15 +2,207 @@
 """
 Text-based model.
 """
+import weakref
+import threading
+import unicodedata
+from array import array
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Dict, List, Tuple, Iterable, Optional
+
+from chemdataextractor import __version__ as cde_version
 from chemdataextractor.doc.text import Span, Sentence, Text
 from chemdataextractor.nlp.tag import POS_TAG_TYPE, NER_TAG_TYPE
 from chemdataextractor.nlp.new_cem import CemTagger, BertFinetunedCRFCemTagger
+from chemdataextractor.nlp.cem import LegacyCemTagger, CrfCemTagger, CiDictCemTagger, CsDictCemTagger
+from chemdataextractor.nlp.pos import ChemCrfPosTagger
 
+from ..cache import TagCache
+from ..threads import current_threads
 from .modi_cde_nlp import ModiBertWordTokenizer
+from .prefilter import ChemPrefilter
+
+
+class LazyCemTagger:
+    """
+    Stands in for the CEM tagger, which is only built when a sentence first needs its CEM tags,
+    so importing the package does not locate or load the BERT model.
+    """
+    tag_type = NER_TAG_TYPE
+
+    def __init__(self, gpu_id: int = -1, backend: str = 'torch'):
+        """
+        Args:
+            gpu_id (int): GPU of the BERT tagger, -1 for the CPU.
+            backend (str): 'torch', or 'onnx' to run BERT on the CPU with ONNX Runtime and int8 weights.
+        """
+        self.gpu_id = gpu_id
+        self.backend = backend
+        self._tagger = None
+        # Threads tagging in parallel, e.g. the stages of iter_extract_staged, build it once.
+        self._lock = threading.Lock()
+
+    @property
+    def built(self) -> bool:
+        return self._tagger is not None
+
+    @property
+    def version(self) -> str:
+        return 'bert-crf-' + self.backend
+
+    @property
+    def tagger(self) -> CemTagger:
+        if self._tagger is None:
+            with self._lock:
+                if self._tagger is None:
+                    if self.backend == 'onnx':
+                        from .onnx_tagger import OnnxBertCrfCemTagger
+                        threads = current_threads()
+                        bert_tagger = OnnxBertCrfCemTagger(threads=threads.intra_op if threads else 0)
+                    else:
+                        bert_tagger = BertFinetunedCRFCemTagger(gpu_id=self.gpu_id)
+                    self._tagger = BertCemTagger(bert_tagger)
+        return self._tagger
+
+    def can_tag(self, tag_type):
+        # Asked for every new sentence, answered without building the tagger.
+        if self._tagger is None:
+            return tag_type == self.tag_type
+        return self._tagger.can_tag(tag_type)
+
+    def __getattr__(self, name):
+        if name.startswith('__') or name in ('_tagger', '_lock'):
+            raise AttributeError(name)
+        return getattr(self.tagger, name)
+
+
+class BertCemTagger(CemTagger):
+    """
+    ``CemTagger`` with its own list of taggers. ``CemTagger.taggers`` belongs to the class, replacing
+    the BERT tagger in it would switch every CEM tagger of the process to the same backend.
+    """
+
+    def __init__(self, bert_tagger):
+        self.taggers = list(CemTagger.taggers)
+        self.taggers[2] = bert_tagger
+        super().__init__()
+
+
+class RuleCemTagger(LegacyCemTagger):
+    """
+    The CRF and dictionary CEM taggers of ChemDataExtractor 1.x combined, without BERT.
+    The CRF tagger needs part-of-speech tags, so a ``ChemCrfPosTagger`` has to come with it.
+    """
+    tag_type = NER_TAG_TYPE
+    taggers = [CrfCemTagger(), CiDictCemTagger(), CsDictCemTagger()]
+
+
+cem_tagger = LazyCemTagger()
+
+# Taggers of the new passages in each mode. 'onnx' is BERT with int8 weights, 'rules' trades
+# recall for a much faster tagging.
+CEM_MODES = {
+    'bert': [cem_tagger],
+    'onnx': [LazyCemTagger(backend='onnx')],
+    'rules': [ChemCrfPosTagger(), RuleCemTagger()],
+}
+
+_local = threading.local()
+
+# Padded wordpieces (sentences x longest sentence) of a tagger batch at most.
+TOKEN_BUDGET = 8192
+
+_tag_cache: Optional[TagCache] = None
+_prefilter: Optional[ChemPrefilter] = None
+
+# CEM tag of the tokens outside any entity.
+OUTSIDE_TAG = 'O'
+
+_UNSET = object()
+
+
+def current_taggers() -> list:
+    return getattr(_local, 'taggers', CEM_MODES['bert'])
+
+
+@contextmanager
+def cem_mode(mode: str):
+    """
+    Tag the ``LText`` created by the current thread inside the block with the taggers of ``mode``.
+    """
+    if mode not in CEM_MODES:
+        raise ValueError('Unknown CEM mode {!r}, expected one of {}.'.format(mode, sorted(CEM_MODES)))
+    previous = current_taggers()
+    _local.taggers = CEM_MODES[mode]
+    try:
+        yield
+    finally:
+        _local.taggers = previous
+
+
+def set_tag_cache(cache: Optional[TagCache]):
+    """
+    Cache the tags of the sentences tagged in batches (the BERT taggers) in this process, none if None.
+    """
+    global _tag_cache
+    _tag_cache = cache
 
-# Whether to use GPU
-CemTagger.taggers[2] = BertFinetunedCRFCemTagger(gpu_id=-1)
-cem_tagger = CemTagger()
+
+def get_tag_cache() -> Optional[TagCache]:
+    """
+    The tag cache of the current thread, see ``using_tag_cache``, otherwise that of the process.
+    """
+    return getattr(_local, 'tag_cache', _tag_cache)
+
+
+@contextmanager
+def using_tag_cache(cache: Optional[TagCache]):
+    """
+    Cache the tags of the sentences the current thread tags inside the block in ``cache``, none if None,
+    whatever ``set_tag_cache`` has set.
+    """
+    previous = getattr(_local, 'tag_cache', _UNSET)
+    _local.tag_cache = cache
+    try:
+        yield
+    finally:
+        if previous is _UNSET:
+            del _local.tag_cache
+        else:
+            _local.tag_cache = previous
+
+
+def set_prefilter(prefilter: Optional[ChemPrefilter]):
+    """
+    Skip the batched CEM taggers (the BERT taggers) in this process on the sentences ``prefilter``
+    rejects, they get no CEMs. None tags every sentence.
+    """
+    global _prefilter
+    _prefilter = prefilter
+
+
+def get_prefilter() -> Optional[ChemPrefilter]:
+    """
+    The prefilter of the current thread, see ``using_prefilter``, otherwise that of the process.
+    """
+    return getattr(_local, 'prefilter', _prefilter)
+
+
+@contextmanager
+def using_prefilter(prefilter: Optional[ChemPrefilter]):
+    """
+    Skip the batched CEM taggers on the sentences ``prefilter`` rejects while the current thread is inside
+    the block, tag every sentence if None, whatever ``set_prefilter`` has set.
+    """
+    previous = getattr(_local, 'prefilter', _UNSET)
+    _local.prefilter = prefilter
+    try:
+        yield
+    finally:
+        if previous is _UNSET:
+            del _local.prefilter
+        else:
+            _local.prefilter = previous
 
 
 class LText(Text):
@@ -23,9 +215,45 @@ class LText(Text):
     abbreviation_detector = None
     word_tokenizer = ModiBertWordTokenizer()
     taggers = [cem_tagger]
+    trigger = None
+
+    def __init__(self, text, taggers=None, trigger: Optional[Callable[[str], bool]] = None, **kwargs):
+        """
+        Args:
+            text (str): The passage text.
+            taggers (list): Taggers of the passage, those of the current ``cem_mode`` by default.
+            trigger (Callable): Gates the tagging of the sentences. By default the first sentence whose tags
+                are needed tags the whole passage in one batch. With a trigger, the sentences are split at once,
+                and that batch only holds the sentences whose text the trigger accepts. The other sentences are
+                only tagged if their own ``cems`` or tags are used, so sentences the extraction skips by its
+                keyword checks never reach the tagger. An option for passages built directly, the pipeline
+                tags every sentence while normalising the text and does not use it.
+        """
+        super().__init__(text, taggers=taggers or current_taggers(), **kwargs)
+        self.trigger = trigger
+        if trigger is not None:
+            # Split into sentences now, cheap next to tagging them.
+            self.sentences
+
+    @classmethod
+    def from_tagged(cls, text: str, sentences: List[Tuple[int, int, List[Tuple[int, int]]]], **kwargs):
+        """
+        Build a passage whose sentence boundaries and CEMs are already known, so no tagger is run for it.
+
+        Args:
+            text (str): The passage text.
+            sentences (list): (start, end, [(cem_start, cem_end), ...]) of each sentence, offsets into text.
+        """
+        ltext = cls(text, **kwargs)
+        sents = ltext._sentences_from_spans([(start, end) for start, end, _ in sentences])
+        for sent, (_, _, cems) in zip(sents, sentences):
+            sent._cems = [Span(text=text[start:end], start=start, end=end) for start, end in cems]
+        ltext._sentences = sents
+        return ltext
 
     def _sentences_from_spans(self, spans):
         sents = []
+        passage = weakref.ref(self)
         for span in spans:
             sent = LSentence(
                 text=self.text[span[0]:span[1]],
@@ -39,23 +267,73 @@ class LText(Text):
                 models=self.models,
                 taggers=self.taggers
             )
+            sent._passage = passage
             sents.append(sent)
         return sents
 
 
 class LSentence(Sentence):
+    """
+    A sentence that stores its tokens compactly: the spans in two integer arrays, the tags column-wise
+    (one list per tag type), and the tokens as ``LRichToken`` views created when ``tokens`` is first used.
+    """
     lexicon = None
     abbreviation_detector = None
     taggers = [cem_tagger]
+    _passage = None
+    # Token offsets relative to the sentence and token texts, set by _set_spans.
+    _starts = _ends = _token_texts = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._tag_columns: Dict[str, list] = {}
+
+    @property
+    def tokens(self):
+        tokens = self.__dict__.get('_tokens')
+        if tokens is None:
+            if self._starts is None:
+                passage = self._passage() if self._passage is not None else None
+                # The other sentences of the passage will need their tokens too, tokenize them together.
+                tokenize_sentences(passage.sentences if passage is not None else [self])
+            if self._starts is None:
+                tokens = self.word_tokenizer.get_word_tokens(self)
+            else:
+                tokens = [LRichToken(self, index) for index in range(len(self._starts))]
+            self._tokens = tokens
+        return tokens
+
+    @property
+    def raw_tokens(self):
+        if self._starts is None:
+            return [token.text for token in self.tokens]
+        return list(self._token_texts)
+
+    def _set_spans(self, spans):
+        self._starts = array('l', [start for start, _ in spans])
+        self._ends = array('l', [end for _, end in spans])
+        # Without the control characters, as Sentence.tokens does.
+        self._token_texts = [_printable(self.text[start:end]) for start, end in spans]
+
+    def _assign_tags(self, tag_type):
+        if _batch_tagger(self, tag_type) is not None:
+            passage = self._passage() if self._passage is not None else None
+            if passage is None:
+                sentences = [self]
+            elif passage.trigger is None:
+                # The other sentences of the passage will need the tags too, tag them together.
+                sentences = passage.sentences
+            else:
+                sentences = [sentence for sentence in passage.sentences
+                             if sentence is self or passage.trigger(sentence.text)]
+            tag_sentences(sentences, tag_type)
+            if tag_type in self._tag_columns:
+                return
+        super()._assign_tags(tag_type)
 
     def _tokens_for_spans(self, spans):
-        toks = [LRichToken(
-            text=self.text[span[0]:span[1]],
-            start=span[0] + self.start,
-            end=span[1] + self.start,
-            sentence=self
-        ) for span in spans]
-        return toks
+        self._set_spans(spans)
+        return [LRichToken(self, index) for index in range(len(spans))]
 
 
 class LToken(Span):
@@ -63,20 +341,35 @@ class LToken(Span):
         super().__init__(text, start, end)
 
 
-class LRichToken(LToken):
+class LRichToken:
+    """
+    A token of an ``LSentence``, a view of the span and tags its sentence stores.
+    """
+    __slots__ = ('sentence', 'index')
 
-    def __init__(self, text, start, end, sentence):
-        super().__init__(text, start, end)
+    def __init__(self, sentence: LSentence, index: int):
         self.sentence = sentence
-        self._tags = {}
+        self.index = index
 
-    @classmethod
-    def _from_token(cls, token, sentence):
-        rich_token = cls(text=token.text,
-                         start=token.start,
-                         end=token.end,
-                         sentence=sentence)
-        return rich_token
+    @property
+    def text(self) -> str:
+        return self.sentence._token_texts[self.index]
+
+    @property
+    def start(self) -> int:
+        return self.sentence.start + self.sentence._starts[self.index]
+
+    @property
+    def end(self) -> int:
+        return self.sentence.start + self.sentence._ends[self.index]
+
+    @property
+    def length(self) -> int:
+        return self.end - self.start
+
+    @property
+    def _tags(self) -> '_TokenTags':
+        return _TokenTags(self.sentence._tag_columns, self.index, len(self.sentence._starts))
 
     @property
     def legacy_pos_tag(self):
@@ -94,13 +387,232 @@ class LRichToken(LToken):
             raise IndexError("Key" + str(key) + " is out of bounds for this token.")
 
     def __getattr__(self, name):
-        if name in self._tags.keys():
-            return self._tags[name]
-        else:
+        if name.startswith('__') or name in LRichToken.__slots__:
+            raise AttributeError(name)
+        columns = self.sentence._tag_columns
+        if name not in columns:
             self.sentence._assign_tags(name)
-            if name not in self._tags.keys():
+            if name not in columns:
                 raise AttributeError(
                     name + " is not a supported tag type for the sentence: " + str(self.sentence) + str(
                         self.sentence.taggers) + str(type(self.sentence))
-                    + str(self._tags) + str(self))
-            return self._tags[name]
+                    + str(list(columns)) + str(self))
+        return columns[name][self.index]
+
+    def __repr__(self):
+        return '%s(%r, %r, %r)' % (self.__class__.__name__, self.text, self.start, self.end)
+
+    def __str__(self):
+        return self.text
+
+    def __eq__(self, other):
+        if not isinstance(other, self.__class__):
+            return False
+        return self.text == other.text and self.start == other.start and self.end == other.end
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.text, self.start, self.end))
+
+
+class _TokenTags:
+    """
+    The tags of one token as a mapping, backed by the tag columns of its sentence. A tag type
+    is present once the sentence has been tagged with it.
+    """
+    __slots__ = ('columns', 'index', 'size')
+
+    def __init__(self, columns: Dict[str, list], index: int, size: int):
+        self.columns, self.index, self.size = columns, index, size
+
+    def __contains__(self, tag_type):
+        return tag_type in self.columns
+
+    def __getitem__(self, tag_type):
+        return self.columns[tag_type][self.index]
+
+    def __setitem__(self, tag_type, tag):
+        column = self.columns.get(tag_type)
+        if column is None:
+            column = self.columns[tag_type] = [None] * self.size
+        column[self.index] = tag
+
+    def get(self, tag_type, default=None):
+        return self[tag_type] if tag_type in self.columns else default
+
+    def keys(self):
+        return self.columns.keys()
+
+    def __repr__(self):
+        return repr({tag_type: column[self.index] for tag_type, column in self.columns.items()})
+
+
+def _printable(text: str) -> str:
+    if text.isprintable():
+        return text
+    return ''.join(ch for ch in text if unicodedata.category(ch)[0] != 'C')
+
+
+def _batch_tagger(sentence: Sentence, tag_type: str):
+    """
+    The tagger that assigns ``tag_type`` to the sentence if it tags in batches, else None.
+    """
+    tagger = next((tagger for tagger in reversed(sentence.taggers) if tagger.can_tag(tag_type)), None)
+    if tagger is not None and hasattr(tagger, 'batch_tag_for_type') and tagger.can_batch_tag(tag_type):
+        return tagger
+    return None
+
+
+def _tag_key(cache: TagCache, tagger, tag_type: str, text: str) -> str:
+    version = '{}:{}:{}'.format(getattr(tagger, 'version', type(tagger).__name__), tag_type, cde_version)
+    # Whitespace is not part of any token, so sentences differing only in it get the same tags.
+    return cache.key(version, ' '.join(text.split()))
+
+
+def tokenize_sentences(sentences: Iterable[Sentence]):
+    """
+    Tokenize the ``LSentence`` not tokenized yet, those of a tokenizer with ``span_tokenize_batch``
+    (``ModiBertWordTokenizer``) in one batch.
+    """
+    pending = {}
+    for sentence in sentences:
+        if (isinstance(sentence, LSentence) and sentence._starts is None
+                and hasattr(sentence.word_tokenizer, 'span_tokenize_batch')):
+            pending.setdefault(sentence.word_tokenizer, []).append(sentence)
+
+    for tokenizer, sents in pending.items():
+        spans = tokenizer.span_tokenize_batch([sentence.text for sentence in sents],
+                                              [tokenizer.get_additional_regex(sentence) for sentence in sents])
+        for sentence, sentence_spans in zip(sents, spans):
+            sentence._set_spans(sentence_spans)
+
+
+@lru_cache(maxsize=1 << 16)
+def _wordpieces(wordpiece_tokenizer, text: str) -> int:
+    return len(wordpiece_tokenizer(text))
+
+
+def _sequence_length(tagger, tag_type: str):
+    """
+    Length of a sentence, from the texts of its tokens, as the model of the tagger sees it:
+    wordpieces for BERT, tokens otherwise.
+    """
+    model = getattr(tagger, 'taggers_dict', {}).get(tag_type, tagger)
+    indexer = next(iter((getattr(model, 'indexers', None) or {}).values()), None)
+    wordpiece_tokenizer = getattr(indexer, 'wordpiece_tokenizer', None)
+    if wordpiece_tokenizer is None:
+        return len
+    # [CLS] and [SEP] around the wordpieces of the tokens.
+    return lambda texts: 2 + sum(_wordpieces(wordpiece_tokenizer, text) for text in texts)
+
+
+def _token_views(sentence: Sentence) -> list:
+    """
+    Tokens to pass to a tagger. Those of a tokenized LSentence are created for the call and not kept on it.
+    """
+    if isinstance(sentence, LSentence) and sentence._starts is not None and '_tokens' not in sentence.__dict__:
+        return [LRichToken(sentence, index) for index in range(len(sentence._starts))]
+    return sentence.tokens
+
+
+def length_buckets(lengths: List[int], token_budget: int, max_size: Optional[int] = None) -> List[List[int]]:
+    """
+    Group sequences of similar length so that padding them to the longest of their group wastes little.
+
+    Args:
+        lengths (List[int]): Length of each sequence.
+        token_budget (int): Padded size (count x longest) of a group at most, a longer sequence is alone.
+        max_size (int): Sequences in a group at most.
+
+    Returns:
+        Groups of indices into ``lengths``, from the shortest sequences to the longest.
+    """
+    buckets, bucket = [], []
+    for index in sorted(range(len(lengths)), key=lengths.__getitem__):
+        if bucket and ((len(bucket) + 1) * lengths[index] > token_budget or len(bucket) == max_size):
+            buckets.append(bucket)
+            bucket = []
+        bucket.append(index)
+    if bucket:
+        buckets.append(bucket)
+    return buckets
+
+
+def tag_sentences(sentences: Iterable[Sentence], tag_type: str = NER_TAG_TYPE, token_budget: Optional[int] = None):
+    """
+    Assign the tags of many sentences, possibly from different passages, with shared tagger batches
+    instead of one sentence at a time. Sentences already tagged are left as they are.
+
+    The sentences are bucketed by length, and each bucket is one forward pass of at most ``token_budget``
+    padded wordpieces (``TOKEN_BUDGET`` by default). With a tag cache set (see ``get_tag_cache``),
+    sentences tagged before are taken from it and only the others are run. With a prefilter set
+    (see ``get_prefilter``), the sentences it rejects are not run either.
+    """
+    cache, prefilter = get_tag_cache(), get_prefilter() if tag_type == NER_TAG_TYPE else None
+    pending = {}
+    # Sentences whose text is already pending, by cache key.
+    repeated = {}
+    sentences = list(sentences)
+    tokenize_sentences(sentences)
+    for sentence in sentences:
+        # The tokens of a tokenized LSentence are not needed to look its tags up.
+        compact = isinstance(sentence, LSentence) and sentence._starts is not None
+        size = len(sentence._starts) if compact else len(sentence.tokens)
+        if not size or tag_type in (sentence._tag_columns if compact else sentence.tokens[0]._tags):
+            continue
+        tagger = _batch_tagger(sentence, tag_type)
+        if tagger is None:
+            continue
+        if prefilter is not None and not prefilter(sentence.raw_tokens):
+            # Nothing that looks chemical, no CEMs without inference.
+            _set_tags(sentence, tag_type, [OUTSIDE_TAG] * size)
+            continue
+        key = None
+        if cache is not None:
+            key = _tag_key(cache, tagger, tag_type, sentence.text)
+            tags = cache.get(key)
+            if tags is not None and len(tags) == size:
+                _set_tags(sentence, tag_type, list(tags))
+                continue
+            if key in repeated:
+                repeated[key].append((sentence, size))
+                continue
+            repeated[key] = []
+        pending.setdefault(tagger, []).append((sentence, key))
+
+    for tagger, sents in pending.items():
+        length = _sequence_length(tagger, tag_type)
+        # Up to min_batch_size sentences the wrapper runs them as one batch.
+        max_size = getattr(getattr(tagger, 'taggers_dict', {}).get(tag_type), 'min_batch_size', None)
+        buckets = length_buckets([length(sentence.raw_tokens) for sentence, _ in sents],
+                                 token_budget or TOKEN_BUDGET, max_size)
+        for bucket in buckets:
+            batch = [sents[i] for i in bucket]
+            tagged_batch = tagger.batch_tag_for_type([_token_views(sentence) for sentence, _ in batch], tag_type)
+            for (sentence, key), tagged in zip(batch, tagged_batch):
+                tags = [tag for _, tag in tagged]
+                _set_tags(sentence, tag_type, tags)
+                if key is not None:
+                    cache.put(key, list(tags))
+                    for other, other_size in repeated.pop(key):
+                        if other_size == len(tags):
+                            _set_tags(other, tag_type, list(tags))
+
+
+def _set_tags(sentence: Sentence, tag_type: str, tags: list):
+    if isinstance(sentence, LSentence):
+        sentence._tag_columns[tag_type] = tags
+    else:
+        for token, tag in zip(sentence.tokens, tags):
+            token._tags[tag_type] = tag
+
+
+def warmup(mode: str = 'bert'):
+    """
+    Build the CEM taggers of ``mode`` and load their models now instead of on the first sentence,
+    e.g. when a server or worker process starts.
+    """
+    with cem_mode(mode):
+        return LText('LiFePO4 was used as the cathode.').cems
@@ -3,35 +3,123 @@
 This module provides a class for assisted chemical named entity recognition (CNER) and post-processing.
 """
 import logging
-from typing import Tuple, Union
+import threading
+from typing import Dict, Tuple, Union
 from string import digits
 from collections import OrderedDict
-from functools import lru_cache
-
-from pymatgen.core.periodic_table import _pt_data
-from pymatgen.core.composition import Composition
+from functools import lru_cache, wraps
 
 from chemdataextractor.text import word_shape, like_number, QUOTES
 
-from cathodedataextractor.cathodetext2chem import (
-    CathodeParserPipelineBuilder,
-    CathodeRegExParser
-)
-
-from text2chem.preprocessing_tools.chemical_name_processing import ChemicalNameProcessing
-from text2chem.postprocessing_tools.element_variables_processing import ElementVariablesProcessing
-from text2chem.postprocessing_tools.stoichiometric_variables_processing import StoichiometricVariablesProcessing
-
 from ..parse import *
 from ..utils import if_num_dot, any_func
+from ..cache import LRUCache
 
 log = logging.getLogger(__name__)
-mp = CathodeParserPipelineBuilder() \
-    .add_preprocessing(ChemicalNameProcessing) \
-    .add_postprocessing(ElementVariablesProcessing) \
-    .add_postprocessing(StoichiometricVariablesProcessing) \
-    .set_regex_parser(CathodeRegExParser) \
-    .build()
+
+
+@lru_cache(None)
+def material_parser():
+    """
+    The text2chem material parser, built on first use since pymatgen and text2chem are slow to import.
+    """
+    from text2chem.preprocessing_tools.chemical_name_processing import ChemicalNameProcessing
+    from text2chem.postprocessing_tools.element_variables_processing import ElementVariablesProcessing
+    from text2chem.postprocessing_tools.stoichiometric_variables_processing import StoichiometricVariablesProcessing
+    from ..cathodetext2chem import CathodeParserPipelineBuilder, CathodeRegExParser
+
+    return CathodeParserPipelineBuilder() \
+        .add_preprocessing(ChemicalNameProcessing) \
+        .add_postprocessing(ElementVariablesProcessing) \
+        .add_postprocessing(StoichiometricVariablesProcessing) \
+        .set_regex_parser(CathodeRegExParser) \
+        .build()
+
+
+@lru_cache(None)
+def periodic_table() -> dict:
+    """
+    The element data of pymatgen, imported on first use since pymatgen is slow to import.
+    """
+    from pymatgen.core.periodic_table import _pt_data
+    return _pt_data
+
+
+def __getattr__(name):
+    # ``mp`` used to be built at import.
+    if name == 'mp':
+        return material_parser()
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+# Values each method cache keeps. The caches live as long as the process, so they must be bounded.
+CACHE_SIZE = 2 ** 14
+
+# Method caches of each CNer setting (tm_limit, prompt_element), shared by the instances with that setting.
+_caches: Dict[Tuple[bool, str], Dict[str, LRUCache]] = {}
+_caches_lock = threading.Lock()
+_MISSING = object()
+
+
+def _method_cache(setting: Tuple[bool, str], name: str) -> LRUCache:
+    caches = _caches.get(setting)
+    if caches is None:
+        with _caches_lock:
+            caches = _caches.setdefault(setting, {})
+    cache = caches.get(name)
+    if cache is None:
+        with _caches_lock:
+            cache = caches.setdefault(name, LRUCache(CACHE_SIZE))
+    return cache
+
+
+def _cached(method):
+    """
+    Memoize a CNer method in the bounded cache of the instance's setting, instead of ``lru_cache``, which keeps
+    every instance alive and grows without limit.
+    """
+    name = method.__name__
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        cache = _method_cache((self.tm_limit, self.prompt_element), name)
+        key = args + tuple(sorted(kwargs.items())) if kwargs else args
+        value = cache.get(key, _MISSING)
+        if value is _MISSING:
+            value = method(self, *args, **kwargs)
+            cache.put(key, value)
+        return value
+
+    return wrapper
+
+
+def set_cache_size(max_entries: int):
+    """
+    Bound every CNer method cache of this process, existing and future ones, to ``max_entries`` values.
+    """
+    global CACHE_SIZE
+    with _caches_lock:
+        CACHE_SIZE = max_entries
+        caches = [cache for method_caches in _caches.values() for cache in method_caches.values()]
+    for cache in caches:
+        cache.resize(max_entries)
+
+
+def cache_stats() -> Dict[str, dict]:
+    """
+    Hits, misses and size of the CNer method caches of this process, keyed by
+    'tm_limit/prompt_element/method'.
+    """
+    with _caches_lock:
+        items = [(setting, name, cache) for setting, method_caches in _caches.items()
+                 for name, cache in method_caches.items()]
+    return {'{}/{}/{}'.format(tm_limit, prompt_element, name): cache.stats()
+            for (tm_limit, prompt_element), name, cache in items}
+
+
+def clear_caches():
+    with _caches_lock:
+        _caches.clear()
 
 
 class CNer:
@@ -50,7 +138,13 @@ class CNer:
         self.tm_limit = tm_limit
         self.prompt_element = prompt_element
 
-    @lru_cache(None)
+    def cache_stats(self) -> Dict[str, dict]:
+        """
+        Hits, misses and size of the method caches shared by the instances with this setting.
+        """
+        return {name: cache.stats() for name, cache in _caches.get((self.tm_limit, self.prompt_element), {}).items()}
+
+    @_cached
     def normalized_compound_formula(self, cem: str) -> str:
         """
         Normalized treatment of inorganic chemical formulas.
@@ -148,7 +242,7 @@ class CNer:
 
         return final_processing(cem) + (' ' + _st if _st else '')
 
-    @lru_cache(None)
+    @_cached
     def prompt_tag(self, cem: str, normalize=False) -> str:
         """
         Further classification of chemical entities.
@@ -218,6 +312,7 @@ class CNer:
             return 'other'
 
         if not likely_abb:
+            from pymatgen.core.composition import Composition
             try:
                 _elements = [element.value for element in Composition(cem).elements]
                 # Transition metal raw materials
@@ -267,7 +362,7 @@ class CNer:
             return False
         return all(check(_) for _ in string.split("-"))
 
-    @lru_cache(None)
+    @_cached
     def is_compound_formula(self, cem: str, normalize: bool = False) -> Union[bool, Tuple[str, list]]:
         """
         Preliminary judgement of compounds.
@@ -293,6 +388,7 @@ class CNer:
 
             if self.separate_phase(_cem)[0]:
                 _cem = self.separate_phase(_cem)[1]
+            from pymatgen.core.composition import Composition
             try:
                 remove_ = 'xyz-+/·δ'
                 for remove in remove_:
@@ -322,17 +418,18 @@ class CNer:
                 return (phase + cem, []) if '□' in _cem else False
         return False
 
-    @lru_cache(None)
+    @_cached
     def chem_parse(self, cem: str, sort=True):
         # 'NaMgx(Ni1/3Fe1/3Mn1/3)1-xO2(x = 0, 0.02, and 0.05)'
-        parsed = mp.parse(cem).to_dict()
+        parsed = material_parser().parse(cem).to_dict()
         if sort and parsed['composition']:
+            pt_data = periodic_table()
             parsed['composition'][0]['elements'] = OrderedDict(sorted(parsed['composition'][0]['elements'].items(),
-                                                                      key=lambda s: _pt_data[s[0]]['IUPAC ordering'])
+                                                                      key=lambda s: pt_data[s[0]]['IUPAC ordering'])
                                                                )
         return parsed
 
-    @lru_cache(None)
+    @_cached
     def chem_backbone(self, cem: str) -> str:
         """
         Removal of phase symbols and closing brackets in chemical entities.
@@ -346,7 +443,7 @@ class CNer:
     Similar to PHASE PROCESSING by: Olga Kononova
     """
 
-    @lru_cache(None)
+    @_cached
     def separate_phase(self, formula: str) -> Tuple[str, str]:
         """
         Separate phase symbol part from formula.
@@ -371,7 +468,7 @@ class CNer:
     -------------------------
     """
 
-    @lru_cache(None)
+    @_cached
     def iupac_formula(self, cem: str) -> str:
         """
         Returns:
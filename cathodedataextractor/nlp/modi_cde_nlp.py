@@ -48,21 +48,58 @@ class ModiChemWordTokenizer(ChemWordTokenizer):
         # Includes: \u0020 \u00A0 \u1680 \u180E \u2000 \u2001 \u2002 \u2003 \u2004 \u2005 \u2006 \u2007 \u2008 \u2009
         # \u200A \u202F \u205F \u3000
         spans = [(left, right) for left, right in regex_span_tokenize(s, '\s+') if not left == right]
-        i = 0
-        # Recursively split spans according to rules
-        while i < len(spans):
-            subspans = self._subspan(s, spans[i], spans[i + 1] if i + 1 < len(spans) else None, additional_regex)
+        # Recursively split spans according to rules. The spans still to split are on a stack, the next on top,
+        # so each split is pushed rather than spliced into the list: linear instead of quadratic in the tokens.
+        stack = spans[::-1]
+        output = []
+        while stack:
+            span = stack.pop()
+            subspans = self._subspan(s, span, stack[-1] if stack else None, additional_regex)
             subspans = [subspan for subspan in subspans if subspan[1] - subspan[0] > 0]
-            spans[i:i + 1] = subspans
             if len(subspans) == 1:
-                i += 1
-        return spans
+                output.append(subspans[0])
+            else:
+                stack.extend(reversed(subspans))
+        return output
 
 
 class ModiBertWordTokenizer(BertWordTokenizer):
 
-    def span_tokenize_bert(self, s, additional_regex=None):
-        output = self.tokenizer.encode(str(s))
+    def span_tokenize(self, s, additional_regex=None):
+        return self._split_additional(s, self._merge_wordpieces(s, self.tokenizer.encode(str(s))), additional_regex)
+
+    def span_tokenize_batch(self, texts, additional_regexes=None):
+        """
+        Spans of each text as ``span_tokenize`` gives them, with the wordpieces of all the texts
+        encoded in one ``encode_batch`` call, in parallel in native code.
+
+        Args:
+            texts (list): The texts.
+            additional_regexes (list): The additional regex of each text, none if None.
+        """
+        encodings = self.tokenizer.encode_batch([str(s) for s in texts])
+        additional_regexes = additional_regexes or [None] * len(texts)
+        return [self._split_additional(s, self._merge_wordpieces(s, encoding), additional_regex)
+                for s, encoding, additional_regex in zip(texts, encodings, additional_regexes)]
+
+    def _split_additional(self, s, spans, additional_regex):
+        # Perform additional tokenisation as required by the additional regex
+        if additional_regex is not None:
+            i = 0
+            while i < len(spans):
+                subspans = self.handle_additional_regex(s, spans[i], spans[i + 1] if i + 1 < len(spans) else None,
+                                                        additional_regex)
+                if subspans is None:
+                    subspans = [spans[i]]
+                spans[i:i + 1] = [subspan for subspan in subspans if subspan[1] - subspan[0] > 0]
+                if len(subspans) == 1:
+                    i += 1
+        return spans
+
+    def _merge_wordpieces(self, s, output):
+        """
+        Merge the wordpieces of ``s`` back into words, keeping numbers and ``do_not_split`` symbols whole.
+        """
         offsets = output.offsets[1: -1]
         given_tokens = output.tokens[1: -1]
         current_span = (0, 0)
@@ -116,6 +153,10 @@ class ModiBertWordTokenizer(BertWordTokenizer):
             i += 1
 
         spans.append(current_span)
+        return spans
+
+    def span_tokenize_bert(self, s, additional_regex=None):
+        spans = self._merge_wordpieces(s, self.tokenizer.encode(str(s)))
 
         # Perform additional tokenisation as required by the additional regex
         if additional_regex is not None:
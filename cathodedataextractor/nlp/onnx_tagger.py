@@ -0,0 +1,145 @@
+# coding=utf-8
+"""
+ONNX Runtime backend of the BERT-CRF CEM tagger.
+
+The fine-tuned BERT encoder and the tag projection are exported to ONNX and quantized to int8 once,
+then run with ONNX Runtime on the CPU. Viterbi decoding stays with the CRF of the AllenNLP model.
+Needs ``onnxruntime``.
+"""
+import os
+import logging
+import hashlib
+from typing import Dict, List
+
+import torch
+from allennlp.data.dataset import Batch
+from allennlp.nn import util
+from chemdataextractor.nlp.new_cem import BertFinetunedCRFCemTagger
+
+__all__ = ['OnnxBertCrfCemTagger', 'OnnxPredictor']
+
+log = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'cathodedataextractor')
+
+# Longest wordpiece sequence of the exported graph, longer ones are split by the embedder in Python.
+_MAX_PIECES = 512
+
+
+class _Logits(torch.nn.Module):
+    """
+    The part of the model that runs in ONNX Runtime: token field tensors to tag logits.
+    """
+
+    def __init__(self, model, keys: List[str]):
+        super().__init__()
+        self.embedder = model.text_field_embedder
+        self.projection = model.tag_projection_layer
+        self.keys = keys
+
+    def forward(self, *tensors):
+        return self.projection(self.embedder(dict(zip(self.keys, tensors))))
+
+
+def _onnx_runtime():
+    try:
+        import onnxruntime
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+    except ImportError:
+        raise ImportError('The onnx mode requires onnxruntime, install it with `pip install onnxruntime`.')
+    return onnxruntime, quantize_dynamic, QuantType
+
+
+class OnnxPredictor:
+    """
+    Drop-in for the ``SentenceTaggerPredictor`` of ``AllenNlpWrapperTagger``.
+    """
+
+    def __init__(self, model, path: str, quantize: bool = True, threads: int = 0):
+        """
+        Args:
+            model (Model): The loaded AllenNLP BERT-CRF model.
+            path (str): The exported model, written on first use.
+            quantize (bool): Quantize the weights of the exported model to int8.
+            threads (int): Intra-op threads of ONNX Runtime, 0 for its default.
+        """
+        self.model = model.eval()
+        self.path = path
+        self.quantize = quantize
+        self.threads = threads
+        self.keys = None
+        self.session = None
+
+    def _tensors(self, instances) -> Dict[str, torch.Tensor]:
+        batch = Batch(instances)
+        batch.index_instances(self.model.vocab)
+        return batch.as_tensor_dict()['tokens']
+
+    def _load(self, tokens: Dict[str, torch.Tensor]):
+        onnxruntime, quantize_dynamic, QuantType = _onnx_runtime()
+        self.keys = sorted(tokens)
+        if not os.path.exists(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # Written under a temporary name, workers starting together may export at the same time.
+            tmp = '{}.{}.tmp'.format(self.path, os.getpid())
+            exported = tmp + '.fp32' if self.quantize else tmp
+            log.info('Exporting the CEM tagger to %s', self.path)
+            torch.onnx.export(_Logits(self.model, self.keys), tuple(tokens[key] for key in self.keys), exported,
+                              input_names=self.keys, output_names=['logits'], opset_version=11,
+                              dynamic_axes=dict({key: {0: 'batch', 1: key + '_length'} for key in self.keys},
+                                                logits={0: 'batch', 1: 'length'}))
+            if self.quantize:
+                quantize_dynamic(exported, tmp, weight_type=QuantType.QInt8)
+                os.remove(exported)
+            os.replace(tmp, self.path)
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = self.threads
+        self.session = onnxruntime.InferenceSession(self.path, options, providers=['CPUExecutionProvider'])
+
+    def predict_batch_instance(self, instances) -> List[dict]:
+        tokens = self._tensors(instances)
+        if self.session is None:
+            self._load(tokens)
+        if set(tokens) != set(self.keys) or max(tensor.size(-1) for tensor in tokens.values()) > _MAX_PIECES:
+            # Not the inputs the graph was exported for.
+            return self.model.forward_on_instances(instances)
+
+        # Inputs the graph does not use (e.g. the mask) were dropped at export.
+        feed = {node.name: tokens[node.name].numpy() for node in self.session.get_inputs()}
+        logits, = self.session.run(['logits'], feed)
+        mask = util.get_text_field_mask(tokens)
+        best_paths = self.model.crf.viterbi_tags(torch.from_numpy(logits), mask)
+        output = self.model.decode({'tags': [path for path, _ in best_paths]})
+        return [{'tags': tags} for tags in output['tags']]
+
+
+class OnnxBertCrfCemTagger(BertFinetunedCRFCemTagger):
+    """
+    ``BertFinetunedCRFCemTagger`` on the CPU with ONNX Runtime and int8 weights.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, quantize: bool = True, threads: int = 0, **kwargs):
+        """
+        Args:
+            cache_dir (str): Where the exported model is kept, it is exported again when the archive changes.
+            quantize (bool): Quantize the weights to int8.
+            threads (int): Intra-op threads of ONNX Runtime, 0 for its default.
+        """
+        kwargs.setdefault('gpu_id', -1)
+        super().__init__(**kwargs)
+        self.cache_dir, self.quantize, self.threads = cache_dir, quantize, threads
+        self._onnx_predictor = None
+
+    def _onnx_path(self) -> str:
+        stat = os.stat(self._archive_location)
+        digest = hashlib.sha1('{}:{}:{}:{}'.format(os.path.abspath(self._archive_location), stat.st_size,
+                                                   stat.st_mtime_ns, self.quantize).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, 'bert_crf_cem_{}.onnx'.format(digest[:16]))
+
+    @property
+    def predictor(self):
+        if self._onnx_predictor is None:
+            _onnx_runtime()
+            self._onnx_predictor = OnnxPredictor(super().predictor._model, self._onnx_path(),
+                                                 self.quantize, self.threads)
+        return self._onnx_predictor
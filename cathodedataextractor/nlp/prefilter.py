@@ -0,0 +1,99 @@
+# coding=utf-8
+"""
+A cheap test of whether a sentence may mention a chemical, run before the BERT CEM tagger.
+"""
+from typing import Iterable
+
+import regex as re
+
+from chemdataextractor.text import word_shape
+
+from ..parse.regex_pattern import ELEMENTS, ELEMENT_NAMES
+
+# Longest symbols first, so that e.g. 'Co' is not read as 'C' followed by 'o'.
+_SYMBOL = '(?:{})'.format('|'.join(sorted(ELEMENTS, key=len, reverse=True)))
+# A formula: element symbols, amounts, stoichiometric variables, brackets and charges. It starts with a symbol
+# or a bracket, so that rates such as 1C are not taken for one.
+FORMULA = re.compile(r'[(\[]*{0}(?:{0}|[\d.,()\[\]{{}}+\-−·/:xyzδ])*'.format(_SYMBOL))
+SYMBOLS = re.compile(_SYMBOL)
+
+# Chemical names, matched on the lowercased token: element names with their derived forms (lithium, lithiated,
+# manganese, ferric, ...), inorganic roots (carbonate, sulfuric, phosphorus, ...) and the organic stems
+# followed by a functional ending (methanol, dimethyl, propylene, benzene, phenol), so that method, property,
+# hexagonal or phenomenon are not taken for one.
+_ELEMENT_NAME = '(?:{})(?:s|ic|ous|ate|ated|ide|ite)?$'.format('|'.join(
+    sorted(set(ELEMENT_NAMES + ['aluminum', 'sulphur']), key=len, reverse=True)))
+_ROOT = '(?:{})'.format('|'.join(
+    ['lith', 'potass', 'mangan', 'ferr', 'cupr', 'alumin', 'magnes', 'silic', 'titan', 'zircon', 'vanad', 'carbon',
+     'carbox', 'hydrox', 'oxal', 'citr', 'vinyl', 'fluor', 'chlor', 'brom', 'iod', 'sulf', 'sulph', 'phosph', 'nitr',
+     'ammon']))
+_ORGANIC = '(?:poly|di|tri|tetra)?(?:meth|eth|prop|but|pent|hex|hept|oct|benz|phen|tolu|xyl|pyrr|pyr|acet|glyc)' \
+           '(?:an|en|yn|yl|ol|al|one|oic|ox|id)'
+NAME = re.compile('(?:{}|{}|{})'.format(_ELEMENT_NAME, _ROOT, _ORGANIC))
+NAME_SUFFIX = re.compile(r'(?:oxide|ide|ate|ite|ene|ane|anol|yl|ium|amine|amide)s?$')
+# Common words of the papers that end like a chemical name.
+NAME_STOPWORDS = {
+    'rate', 'rates', 'state', 'states', 'separate', 'separated', 'indicate', 'indicates', 'demonstrate',
+    'demonstrates', 'illustrate', 'illustrates', 'investigate', 'evaluate', 'generate', 'accurate', 'moderate',
+    'approximate', 'appropriate', 'ultimate', 'estimate', 'immediate', 'adequate', 'intermediate', 'provide',
+    'provides', 'side', 'sides', 'wide', 'inside', 'outside', 'medium', 'equilibrium', 'composite', 'composites',
+    'favorite', 'definite', 'infinite', 'despite', 'quite', 'white', 'write', 'site', 'sites', 'date',
+    'update', 'candidate', 'candidates', 'plate', 'plates', 'create', 'decide', 'guide', 'slide', 'whereas',
+    'membrane', 'membranes', 'plane', 'planes', 'lead', 'leads'}
+# Element symbols that are also common words at the start of a sentence.
+SYMBOL_STOPWORDS = {'In', 'As', 'At', 'No', 'Be', 'He', 'Am', 'Es'}
+
+
+def is_candidate(token: str) -> bool:
+    """
+    Whether the token may be (part of) a chemical entity mention. Errs towards yes.
+    """
+    if not token:
+        return False
+    if token[0].isupper() or token[0] in '([':
+        if FORMULA.fullmatch(token):
+            # More than one symbol or an amount, e.g. LiFePO4, NaCl, CO2, or a lone two-letter symbol, e.g. Li.
+            if any(c.isdigit() for c in token) or len(SYMBOLS.findall(token)) > 1:
+                return True
+            if len(token) == 2 and token not in SYMBOL_STOPWORDS:
+                return True
+        shape = word_shape(token)
+        # Capitals after lower case (LiTFSI), letters then digits (NCM811), or acronyms (PVDF, NMP).
+        if 'xX' in shape or ('d' in shape and shape[0] == 'X') or (len(token) > 1 and token.isupper()):
+            return True
+    lower = token.lower()
+    if lower in NAME_STOPWORDS or len(lower) < 4:
+        return False
+    return bool(NAME.match(lower) or NAME_SUFFIX.search(lower))
+
+
+class ChemPrefilter:
+    """
+    Skips the BERT CEM tagger on sentences without a token that looks chemical: no element symbols making up
+    a formula, no chemical name morphemes and no acronym or formula-like word shape. Such sentences get
+    no CEMs without inference.
+    """
+
+    def __init__(self, threshold: int = 1):
+        """
+        Args:
+            threshold (int): Candidate tokens a sentence needs to be tagged. 1 keeps the recall highest,
+                see ``benchmarks/prefilter_recall.py`` to tune it.
+        """
+        self.threshold = threshold
+
+    def __call__(self, tokens: Iterable[str]) -> bool:
+        """
+        Args:
+            tokens (Iterable[str]): The token texts of a sentence.
+
+        Returns:
+            Whether the sentence has to be tagged.
+        """
+        candidates = 0
+        for token in tokens:
+            if is_candidate(token):
+                candidates += 1
+                if candidates >= self.threshold:
+                    return True
+        return False
@@ -20,6 +20,7 @@ from . import (
 from .crc_relation import cycle_retentions, cycle_capacities
 
 from ..utils import if_num_dot, any_func
+from ..stats import stage, count
 from ..nlp import CNer, LText, AbbreviationDetection, units_tokenizer
 
 tokenizer = units_tokenizer
@@ -35,6 +36,20 @@ class PropertyParse:
 
     pro_list = {'mAhg-1', '%', 'V', 'C', 'mAg-1', 'cycle', 'cycles', '°C', 'h'}
 
+    @staticmethod
+    def experiment_trigger(text: str) -> bool:
+        """
+        Whether ``experimental_extraction`` looks at a sentence, see the trigger of ``LText``.
+        """
+        return '°C' in text
+
+    @staticmethod
+    def property_trigger(text: str) -> bool:
+        """
+        Whether ``property_extraction`` extracts properties, and chemical entities, from a sentence.
+        """
+        return any(_ in text for _ in ['mAhg-1', '%'])
+
     def __init__(self, doi=None, year=None, abb_names=None, stoichiometric_variable=None):
 
         self.doi = doi
@@ -58,13 +73,15 @@ class PropertyParse:
         self.results = []
         self.property_dict = []
 
+    @stage('experimental_extraction')
     def experimental_extraction(self, obj: LText):
         """
         Experimental paragraph relation extraction.
         """
+        count(sentences=len(obj.sentences))
         for sentence in obj.sentences:
             _text = sentence.text
-            if '°C' not in _text:
+            if not self.experiment_trigger(_text):
                 continue
             # Temperature-time binary pairs.
             t_ls, h_ls, pre_ = [], [], None
@@ -103,11 +120,13 @@ class PropertyParse:
             self._temperature = max_
             self._time = self.time[ind_]
 
+    @stage('property_extraction')
     def property_extraction(self, paragraph: LText):
         """
         Electrochemical property extraction.
         """
         sentences_ = paragraph.sentences
+        count(sentences=len(sentences_))
         self.v_record = False
         for ind_n, sentence in enumerate(sentences_):
             property_dict = {}
@@ -124,7 +143,7 @@ class PropertyParse:
 
             property_dict['sentence'] = _text
 
-            if any(_ in _text for _ in ['mAhg-1', '%']):  # First filter out paragraphs with properties.
+            if self.property_trigger(_text):  # First filter out paragraphs with properties.
 
                 property_dict['S_id'] = ind_n
 
@@ -4,7 +4,6 @@ Post-processing of data records
 """
 import os
 import json
-import pandas as pd
 from copy import deepcopy
 from .utils import write_into_json
 
@@ -0,0 +1,100 @@
+# coding=utf-8
+"""
+Deterministic corpus sharding and merging of per-shard outputs.
+"""
+import json
+import hashlib
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from .utils import doi_from_filename
+
+__all__ = ['shard_index', 'shard_paths', 'merge_shards', 'MergeReport']
+
+
+def shard_index(path: str, count: int) -> int:
+    """
+    Shard of a document, from a stable hash of the doi in its file name. The same on every machine and run.
+    """
+    digest = hashlib.sha1(doi_from_filename(path).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count
+
+
+def shard_paths(paths: Iterable[str], index: int, count: int) -> Iterator[str]:
+    return (path for path in paths if shard_index(path, count) == index)
+
+
+class MergeReport(NamedTuple):
+    documents: int
+    records: int
+    missing: List[str] = []
+    duplicated: List[str] = []
+    failed: List[str] = []
+    unexpected: List[str] = []
+
+    @property
+    def ok(self) -> bool:
+        """Every expected document was processed exactly once and without an error."""
+        return not (self.missing or self.duplicated or self.failed or self.unexpected)
+
+    def __str__(self):
+        lines = ['{} documents, {} records'.format(self.documents, self.records)]
+        for name in ('missing', 'duplicated', 'failed', 'unexpected'):
+            dois = getattr(self, name)
+            if dois:
+                shown = ', '.join(dois[:20]) + (' ...' if len(dois) > 20 else '')
+                lines.append('{} {}: {}'.format(len(dois), name, shown))
+        return '\n'.join(lines)
+
+
+def _entries(path: str) -> Iterator[dict]:
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                entry['doi'] = entry.get('doi') or doi_from_filename(entry.get('path') or '')
+                yield entry
+
+
+def merge_shards(inputs: Iterable[str], output: str, expected: Optional[Iterable[str]] = None) -> MergeReport:
+    """
+    Combine the JSONL outputs of the shards into one file, one line per doi in doi order.
+
+    A doi output more than once is kept once: the latest entry without an error, otherwise the latest
+    failure. Only a doi extracted successfully more than once counts as duplicated, a failure retried
+    with ``--resume`` does not.
+
+    Args:
+        inputs (Iterable[str]): JSONL files written by ``cathodedataextractor extract``.
+        output (str): Merged JSONL file.
+        expected (Iterable[str]): Input document paths of all the shards, to check that each one was processed.
+
+    Returns:
+        ``MergeReport`` of the merged dataset.
+    """
+    succeeded: Counter = Counter()
+    merged: Dict[str, dict] = {}
+    for path in inputs:
+        for entry in _entries(path):
+            doi = entry['doi']
+            if not entry.get('error'):
+                succeeded[doi] += 1
+                merged[doi] = entry
+            elif doi not in merged or merged[doi].get('error'):
+                merged[doi] = entry
+
+    records = 0
+    with open(output, 'w', encoding='utf-8') as f:
+        for doi in sorted(merged):
+            records += len(merged[doi].get('records') or [])
+            json.dump(merged[doi], f, ensure_ascii=False)
+            f.write('\n')
+
+    expected_dois = None if expected is None else {doi_from_filename(path) for path in expected}
+    return MergeReport(
+        documents=len(merged),
+        records=records,
+        missing=sorted(expected_dois - merged.keys()) if expected_dois is not None else [],
+        duplicated=sorted(doi for doi, times in succeeded.items() if times > 1),
+        failed=sorted(doi for doi, entry in merged.items() if entry.get('error')),
+        unexpected=sorted(merged.keys() - expected_dois) if expected_dois is not None else [])
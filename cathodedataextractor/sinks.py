@@ -0,0 +1,164 @@
+# coding=utf-8
+"""
+Output sinks of batch extraction.
+"""
+import sys
+import csv
+import json
+from typing import List
+
+from .relationextractpostprocessing import _sort
+from .utils import doi_from_filename
+
+__all__ = ['JsonlSink', 'CsvSink', 'ParquetSink', 'sink_type', 'open_sink', 'SINKS']
+
+RECORD_COLUMNS = list(_sort) + ['Elements']
+
+
+class Sink:
+    """
+    Writes the results of documents one after another.
+    """
+    # Whether an existing file can be appended to, i.e. a run resumed.
+    resumable = True
+
+    def __init__(self, path: str, append: bool = False):
+        """
+        Args:
+            path (str): Output file, '-' for the standard output.
+            append (bool): Append to an existing file, e.g. when resuming.
+        """
+        self.path = path
+        self.append = append
+
+    def write(self, output):
+        """
+        Args:
+            output (PipelineOutputData): Result of a document.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JsonlSink(Sink):
+    """
+    One JSON object per document: its path, doi, error and records.
+    """
+
+    def __init__(self, path: str, append: bool = False):
+        super().__init__(path, append)
+        self.file = sys.stdout if path == '-' else open(path, 'a' if append else 'w', encoding='utf-8')
+
+    def write(self, output):
+        doi = (output.prep_data or {}).get('doi') or (doi_from_filename(output.path) if output.path else None)
+        json.dump({'path': output.path, 'doi': doi, 'error': output.error,
+                   'records': output.post_relation_extract_res or []}, self.file, ensure_ascii=False)
+        self.file.write('\n')
+        self.file.flush()
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+def _cell(value):
+    return json.dumps(value, ensure_ascii=False) if isinstance(value, (dict, list, tuple)) else value
+
+
+class CsvSink(Sink):
+    """
+    One row per record, failed documents and documents without records are left out.
+    """
+
+    def __init__(self, path: str, append: bool = False):
+        super().__init__(path, append)
+        self.file = sys.stdout if path == '-' else open(path, 'a' if append else 'w', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, ['Path'] + RECORD_COLUMNS, extrasaction='ignore')
+        if not append or self.file.tell() == 0:
+            self.writer.writeheader()
+
+    def write(self, output):
+        for record in output.post_relation_extract_res or []:
+            row = {key: _cell(value) for key, value in record.items()}
+            row['Path'] = output.path
+            self.writer.writerow(row)
+        self.file.flush()
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+class ParquetSink(Sink):
+    """
+    Same rows as ``CsvSink`` as string columns, written in row groups. Needs ``pyarrow``.
+    """
+    resumable = False
+
+    def __init__(self, path: str, append: bool = False, row_group_size: int = 1000):
+        super().__init__(path, append)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError('Parquet output requires pyarrow, install it with `pip install pyarrow`.')
+        if append:
+            raise ValueError('Parquet output cannot be appended to.')
+        self.pa = pa
+        self.columns = ['Path'] + RECORD_COLUMNS
+        self.writer = pq.ParquetWriter(path, pa.schema([(column, pa.string()) for column in self.columns]))
+        self.row_group_size = row_group_size
+        self.rows: List[dict] = []
+
+    def write(self, output):
+        for record in output.post_relation_extract_res or []:
+            row = {key: None if value is None else str(_cell(value)) for key, value in record.items()}
+            row['Path'] = output.path
+            self.rows.append(row)
+        if len(self.rows) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if self.rows:
+            table = self.pa.table({column: [row.get(column) for row in self.rows] for column in self.columns},
+                                  schema=self.writer.schema)
+            self.writer.write_table(table)
+            self.rows = []
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+
+
+SINKS = {'jsonl': JsonlSink, 'csv': CsvSink, 'parquet': ParquetSink}
+
+
+def sink_type(path: str, fmt: str = None) -> type:
+    """
+    Args:
+        path (str): Output file, '-' for the standard output.
+        fmt (str): One of ``SINKS``, taken from the file extension if not given, JSONL by default.
+    """
+    if fmt is None:
+        extension = path.rsplit('.', 1)[-1].lower() if '.' in path else ''
+        fmt = {'json': 'jsonl', 'pq': 'parquet'}.get(extension, extension)
+        fmt = fmt if fmt in SINKS else 'jsonl'
+    return SINKS[fmt]
+
+
+def open_sink(path: str, fmt: str = None, append: bool = False) -> Sink:
+    """
+    Args:
+        path (str): Output file, '-' for the standard output.
+        fmt (str): Same as for ``sink_type``.
+        append (bool): Append to an existing file.
+    """
+    return sink_type(path, fmt)(path, append=append)
@@ -0,0 +1,164 @@
+# coding=utf-8
+"""
+Pipelined execution of a chain of stages.
+"""
+import queue
+import logging
+import threading
+from typing import Any, Callable, Iterable, Iterator, List, NamedTuple, Optional
+
+from .stats import recording, merge, PipelineHook
+
+__all__ = ['Stage', 'StagedResult', 'StagedExecutor']
+
+log = logging.getLogger(__name__)
+
+_DONE = object()
+_POLL = 0.1
+
+
+class Stage(NamedTuple):
+    """
+    A step of the chain, run by ``workers`` threads reading from a queue of ``queue_size`` items.
+    """
+    name: str
+    func: Callable[[Any], Any]
+    workers: int = 1
+    queue_size: int = 2
+
+
+class StagedResult(NamedTuple):
+    item: Any
+    value: Any = None
+    error: Optional[Exception] = None
+    stage: Optional[str] = None
+    stats: Optional[dict] = None
+
+
+class _Job:
+    __slots__ = ('seq', 'item', 'value', 'error', 'stage', 'stats')
+
+    def __init__(self, seq, item):
+        self.seq, self.item, self.value = seq, item, item
+        self.error = self.stage = None
+        self.stats = {}
+
+
+def _get(inbox: queue.Queue, stop: threading.Event):
+    while True:
+        try:
+            return inbox.get(timeout=_POLL)
+        except queue.Empty:
+            if stop.is_set():
+                return _DONE
+
+
+def _put(outbox: queue.Queue, job, stop: threading.Event) -> bool:
+    while True:
+        try:
+            outbox.put(job, timeout=_POLL)
+            return True
+        except queue.Full:
+            if stop.is_set():
+                return False
+
+
+class StagedExecutor:
+    """
+    Runs items through a chain of stages at the same time, so item N + 1 can be in the first stage
+    while item N is in the second.
+
+    The queues between the stages are bounded, a slow stage blocks the ones before it instead of letting
+    items pile up. An item whose stage raises skips the remaining stages and is returned with the error.
+    The stages run in threads, so they overlap where the work releases the GIL (I/O, torch inference).
+    """
+
+    def __init__(self, stages: List[Stage], hooks: Iterable[PipelineHook] = ()):
+        """
+        Args:
+            stages (List[Stage]): The chain, the output of each stage is the input of the next.
+            hooks (Iterable[PipelineHook]): Their ``on_stage`` is called from the stage threads.
+        """
+        if not stages:
+            raise ValueError('At least one stage is needed.')
+        self.stages = list(stages)
+        self.hooks = list(hooks)
+
+    def map(self, items: Iterable, ordered: bool = True) -> Iterator[StagedResult]:
+        """
+        Args:
+            items (Iterable): Inputs of the first stage, consumed lazily.
+            ordered (bool): Yield the results in input order, otherwise in completion order.
+
+        Yields:
+            ``StagedResult`` with the output of the last stage, or the error and the stage that raised it.
+            ``stats`` holds the counters recorded by ``stats.stage`` while the item was processed.
+        """
+        stop = threading.Event()
+        queues = [queue.Queue(stage.queue_size) for stage in self.stages]
+        queues.append(queue.Queue(max(stage.queue_size for stage in self.stages)))
+        remaining = [stage.workers for stage in self.stages]
+        lock = threading.Lock()
+        feeder_error = []
+
+        def feed():
+            try:
+                for seq, item in enumerate(items):
+                    if not _put(queues[0], _Job(seq, item), stop):
+                        return
+            except Exception as e:  # Raised again by the consumer.
+                feeder_error.append(e)
+            finally:
+                for _ in range(self.stages[0].workers):
+                    _put(queues[0], _DONE, stop)
+
+        def work(index: int):
+            stage, inbox, outbox = self.stages[index], queues[index], queues[index + 1]
+            while True:
+                job = _get(inbox, stop)
+                if job is _DONE:
+                    break
+                if job.error is None:
+                    with recording(self.hooks) as recorder:
+                        try:
+                            job.value = stage.func(job.value)
+                        except Exception as e:
+                            log.exception('Stage %s failed on %r', stage.name, job.item)
+                            job.error, job.stage, job.value = e, stage.name, None
+                    merge(job.stats, recorder.as_dict())
+                if not _put(outbox, job, stop):
+                    break
+            with lock:
+                remaining[index] -= 1
+                last = remaining[index] == 0
+            if last:
+                receivers = self.stages[index + 1].workers if index + 1 < len(self.stages) else 1
+                for _ in range(receivers):
+                    _put(outbox, _DONE, stop)
+
+        threads = [threading.Thread(target=feed, daemon=True)]
+        threads.extend(threading.Thread(target=work, args=(index,), daemon=True)
+                       for index, stage in enumerate(self.stages) for _ in range(stage.workers))
+        for thread in threads:
+            thread.start()
+
+        try:
+            buffer, expected = {}, 0
+            while True:
+                job = _get(queues[-1], stop)
+                if job is _DONE:
+                    break
+                if not ordered:
+                    yield StagedResult(job.item, job.value, job.error, job.stage, job.stats)
+                    continue
+                buffer[job.seq] = job
+                while expected in buffer:
+                    job = buffer.pop(expected)
+                    expected += 1
+                    yield StagedResult(job.item, job.value, job.error, job.stage, job.stats)
+            if feeder_error:
+                raise feeder_error[0]
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
@@ -0,0 +1,155 @@
+# coding=utf-8
+"""
+Per-stage timing and counters of the extraction pipeline.
+"""
+import time
+import threading
+from contextlib import contextmanager, ContextDecorator
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+__all__ = ['stage', 'count', 'recording', 'merge', 'StageRecorder', 'PipelineHook', 'CorpusStats']
+
+COUNTERS = ('calls', 'time', 'sentences', 'cems', 'cache_hits', 'cache_misses')
+
+_local = threading.local()
+
+
+class PipelineHook:
+    """
+    Callbacks of the pipeline, override the ones needed.
+    """
+
+    def on_stage_start(self, name: str):
+        """Called each time a stage starts in the current process."""
+
+    def on_stage(self, name: str, seconds: float):
+        """Called each time a stage finishes in the current process."""
+
+    def on_document(self, output):
+        """Called with the ``PipelineOutputData`` of each finished document."""
+
+
+class StageRecorder:
+    """
+    Collects the counters of the stages run while it is active.
+    """
+
+    def __init__(self, hooks: Iterable[PipelineHook] = ()):
+        self.hooks = list(hooks)
+        self.stages: Dict[str, Dict[str, float]] = OrderedDict()
+        self._stack = []
+
+    def counters(self, name: str) -> Dict[str, float]:
+        if name not in self.stages:
+            self.stages[name] = dict.fromkeys(COUNTERS, 0)
+        return self.stages[name]
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        return {name: dict(counters) for name, counters in self.stages.items()}
+
+
+def current_recorder() -> Optional[StageRecorder]:
+    return getattr(_local, 'recorder', None)
+
+
+@contextmanager
+def recording(hooks: Iterable[PipelineHook] = ()):
+    """
+    Record the stages run by the current thread inside the block.
+
+    Yields:
+        The active ``StageRecorder``.
+    """
+    previous = current_recorder()
+    _local.recorder = recorder = StageRecorder(hooks)
+    try:
+        yield recorder
+    finally:
+        _local.recorder = previous
+
+
+class stage(ContextDecorator):
+    """
+    Time a block or a function as the stage ``name``, a no-op when nothing is recording.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        recorder = current_recorder()
+        if recorder is not None:
+            for hook in recorder.hooks:
+                hook.on_stage_start(self.name)
+            recorder._stack.append((self.name, time.perf_counter()))
+        return self
+
+    def __exit__(self, *exc):
+        recorder = current_recorder()
+        if recorder is None or not recorder._stack:
+            return False
+        name, start = recorder._stack.pop()
+        seconds = time.perf_counter() - start
+        counters = recorder.counters(name)
+        counters['calls'] += 1
+        counters['time'] += seconds
+        for hook in recorder.hooks:
+            hook.on_stage(name, seconds)
+        return False
+
+
+def count(**counts: int):
+    """
+    Add to the counters (sentences, cems, cache_hits, cache_misses) of the innermost running stage.
+    """
+    recorder = current_recorder()
+    if recorder is None or not recorder._stack:
+        return
+    counters = recorder.counters(recorder._stack[-1][0])
+    for key, value in counts.items():
+        counters[key] += value
+
+
+def merge(total: Dict[str, Dict[str, float]], stats: Optional[Dict[str, Dict[str, float]]]):
+    """
+    Add the stage counters of ``stats`` to ``total`` in place.
+    """
+    for name, counters in (stats or {}).items():
+        into = total.setdefault(name, dict.fromkeys(COUNTERS, 0))
+        for key, value in counters.items():
+            into[key] = into.get(key, 0) + value
+    return total
+
+
+class CorpusStats(PipelineHook):
+    """
+    Aggregate the stage counters of every document of a corpus run.
+    """
+
+    def __init__(self):
+        self.documents = self.failed = 0
+        self.stages: Dict[str, Dict[str, float]] = OrderedDict()
+        self.start = time.perf_counter()
+
+    def on_document(self, output):
+        self.documents += 1
+        if output.error:
+            self.failed += 1
+        merge(self.stages, output.stats)
+
+    def report(self) -> str:
+        """
+        Returns:
+            A table of the totals of each stage.
+        """
+        elapsed = time.perf_counter() - self.start
+        lines = ['{} documents ({} failed) in {:.1f}s, {:.2f} documents/s'.format(
+            self.documents, self.failed, elapsed, self.documents / elapsed if elapsed else 0.),
+            '{:<24}{:>8}{:>12}{:>12}{:>12}{:>10}{:>12}{:>14}'.format(
+                'stage', 'calls', 'time (s)', 'mean (ms)', 'sentences', 'cems', 'cache hits', 'cache misses')]
+        for name, c in self.stages.items():
+            lines.append('{:<24}{:>8}{:>12.2f}{:>12.1f}{:>12}{:>10}{:>12}{:>14}'.format(
+                name, c['calls'], c['time'], 1000 * c['time'] / c['calls'] if c['calls'] else 0.,
+                c['sentences'], c['cems'], c['cache_hits'], c['cache_misses']))
+        return '\n'.join(lines)
@@ -0,0 +1,244 @@
+# coding=utf-8
+"""
+Worker processes that are killed and replaced when a document overruns its time or memory.
+"""
+import time
+import logging
+import multiprocessing
+from multiprocessing.connection import wait
+from typing import Any, Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .stats import PipelineHook
+
+__all__ = ['SupervisedPool', 'WorkerFailure', 'StageReporter', 'report_stage', 'rss', 'uss']
+
+log = logging.getLogger(__name__)
+
+_STAGE_SIZE = 64
+_stage_array = None
+
+# Sent by a worker once its initializer has run.
+_READY = 'ready'
+
+
+class WorkerFailure(NamedTuple):
+    """
+    Why a worker was lost while processing an item, and the stage it was in.
+    """
+    kind: str
+    message: str
+    stage: str = ''
+
+    def __str__(self):
+        return '{}: {}{}'.format(self.kind, self.message, ' in stage {}'.format(self.stage) if self.stage else '')
+
+
+def rss(pid: int) -> Optional[int]:
+    """
+    Resident memory of a process in bytes, None where /proc is not available.
+    """
+    try:
+        with open('/proc/{}/status'.format(pid)) as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def uss(pid: int) -> Optional[int]:
+    """
+    Unique memory of a process in bytes, the pages no other process shares, None where /proc is not available.
+    Memory a forked worker shares copy-on-write with its parent is not counted.
+    """
+    try:
+        with open('/proc/{}/smaps_rollup'.format(pid)) as f:
+            return sum(int(line.split()[1]) * 1024 for line in f
+                       if line.startswith(('Private_Clean:', 'Private_Dirty:')))
+    except OSError:
+        return None
+
+
+def report_stage(name: str):
+    """
+    Tell the supervisor which stage the current worker is in, a no-op outside a supervised worker.
+    """
+    if _stage_array is not None:
+        _stage_array.value = name.encode('utf-8')[:_STAGE_SIZE - 1]
+
+
+class StageReporter(PipelineHook):
+    """
+    Reports the innermost running stage of the pipeline to the supervisor.
+    """
+
+    def __init__(self):
+        self.running: List[str] = []
+
+    def on_stage_start(self, name: str):
+        self.running.append(name)
+        report_stage(name)
+
+    def on_stage(self, name: str, seconds: float):
+        if self.running:
+            self.running.pop()
+        report_stage(self.running[-1] if self.running else '')
+
+
+def _worker_main(conn, stage, initializer, initargs, func):
+    global _stage_array
+    _stage_array = stage
+    if initializer is not None:
+        initializer(*initargs)
+    conn.send(_READY)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        seq, item = task
+        report_stage('')
+        conn.send((seq, func(item)))
+
+
+class _Worker:
+    __slots__ = ('process', 'conn', 'stage', 'task', 'start', 'ready')
+
+    def __init__(self, process, conn, stage):
+        self.process, self.conn, self.stage = process, conn, stage
+        self.task: Optional[Tuple[int, Any]] = None
+        # When the worker started on its task, None until it is ready: loading the models is not timed.
+        self.start: Optional[float] = None
+        self.ready = False
+
+
+class SupervisedPool:
+    """
+    Each worker process gets one item at a time. A worker that runs longer than ``timeout`` on an item,
+    or whose resident memory exceeds ``max_rss``, is killed and replaced, and the item is returned with
+    a ``WorkerFailure``. A worker that dies on its own is replaced the same way.
+
+    The time of an item counts from when its worker is ready, so the ``initializer`` of a new worker,
+    e.g. loading the models, is not charged to its first item.
+    """
+
+    def __init__(self, workers: int, initializer: Callable = None, initargs: tuple = (),
+                 timeout: Optional[float] = None, max_rss: Optional[int] = None, poll: float = 0.5,
+                 context=None):
+        """
+        Args:
+            workers (int): Number of worker processes.
+            initializer (Callable): Called with ``initargs`` when a worker starts, e.g. to load the models.
+            timeout (float): Seconds an item may take.
+            max_rss (int): Resident memory a worker may use, in bytes. Only enforced where /proc exists.
+            poll (float): Seconds between checks of the running workers.
+            context: ``multiprocessing`` context the workers are started with, the default one if None.
+        """
+        self.workers = max(workers, 1)
+        self.initializer, self.initargs = initializer, initargs
+        self.timeout, self.max_rss, self.poll = timeout, max_rss, poll
+        self.ctx = context or multiprocessing.get_context()
+
+    def _spawn(self, func: Callable) -> _Worker:
+        conn, child_conn = self.ctx.Pipe()
+        stage = self.ctx.Array('c', _STAGE_SIZE, lock=False)
+        process = self.ctx.Process(target=_worker_main, daemon=True,
+                                   args=(child_conn, stage, self.initializer, self.initargs, func))
+        process.start()
+        child_conn.close()
+        return _Worker(process, conn, stage)
+
+    @staticmethod
+    def _stop(worker: _Worker, kill: bool = False):
+        if not kill:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+            worker.process.join(1)
+        if worker.process.is_alive():
+            worker.process.kill()
+            worker.process.join()
+        worker.conn.close()
+
+    def _breach(self, worker: _Worker) -> Optional[WorkerFailure]:
+        stage = worker.stage.value.decode('utf-8', 'replace')
+        if self.timeout and worker.start is not None and time.monotonic() - worker.start > self.timeout:
+            return WorkerFailure('DocumentTimeout', 'exceeded {}s'.format(self.timeout), stage)
+        if self.max_rss:
+            used = rss(worker.process.pid)
+            if used is not None and used > self.max_rss:
+                return WorkerFailure('MemoryLimitExceeded', 'resident memory {} MB over the limit of {} MB'.format(
+                    used >> 20, self.max_rss >> 20), stage)
+        return None
+
+    def map(self, func: Callable, items: Iterable, ordered: bool = True) -> Iterator[Tuple[Any, Any]]:
+        """
+        Args:
+            func (Callable): Applied to each item in the workers, must be picklable.
+            items (Iterable): Consumed lazily, one item per worker is in flight.
+            ordered (bool): Yield the results in input order, otherwise in completion order.
+
+        Yields:
+            (item, ``func(item)`` or a ``WorkerFailure``).
+        """
+        tasks = enumerate(items)
+        workers = [self._spawn(func) for _ in range(self.workers)]
+        buffer, expected, exhausted = {}, 0, False
+        try:
+            while True:
+                for worker in workers:
+                    if worker.task is None and not exhausted:
+                        task = next(tasks, None)
+                        if task is None:
+                            exhausted = True
+                            break
+                        worker.task = task
+                        worker.start = time.monotonic() if worker.ready else None
+                        worker.conn.send(task)
+
+                busy = [worker for worker in workers if worker.task is not None]
+                if not busy:
+                    break
+                ready = wait([worker.conn for worker in busy], timeout=self.poll)
+
+                finished = []
+                for index, worker in enumerate(workers):
+                    if worker.task is None:
+                        continue
+                    if worker.conn in ready:
+                        try:
+                            message = worker.conn.recv()
+                            if message == _READY:
+                                worker.ready, worker.start = True, time.monotonic()
+                                continue
+                            finished.append((worker.task, message[1]))
+                            worker.task = None
+                            continue
+                        except (EOFError, OSError):
+                            worker.process.join(1)
+                            failure = WorkerFailure('WorkerDied', 'exit code {}'.format(worker.process.exitcode),
+                                                    worker.stage.value.decode('utf-8', 'replace'))
+                    else:
+                        failure = self._breach(worker)
+                        if failure is None:
+                            continue
+                    log.error('Worker %d failed on %r: %s', worker.process.pid, worker.task[1], failure)
+                    finished.append((worker.task, failure))
+                    self._stop(worker, kill=True)
+                    workers[index] = self._spawn(func)
+
+                for (seq, item), result in finished:
+                    if not ordered:
+                        yield item, result
+                        continue
+                    buffer[seq] = (item, result)
+                    while expected in buffer:
+                        yield buffer.pop(expected)
+                        expected += 1
+        finally:
+            for worker in workers:
+                self._stop(worker, kill=worker.task is not None)
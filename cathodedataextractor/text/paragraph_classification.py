@@ -12,7 +12,8 @@ import bs4.element
 from bs4 import BeautifulSoup
 from bs4.element import Tag, NavigableString
 
-from ..parse import PARAGRAPH_SEPARATOR, c_a_pattern, fig_pattern, BACKSLASH_REPLACEMENT
+from ..parse import PARAGRAPH_SEPARATOR, c_a_pattern, fig_pattern
+from ..utils import doi_from_filename
 
 log = logging.getLogger(__name__)
 
@@ -56,7 +57,7 @@ class TagClassificationPar2Text:
 
         self._do_getabstract = False
 
-        self.doi = tail.rsplit(".", 1)[0].replace(BACKSLASH_REPLACEMENT, "/")
+        self.doi = doi_from_filename(tail)
 
         select_pattern = 'xml' if tail.endswith('xml') else 'html.parser'
         fp = open(f'{head}/{tail}', 'rb')
@@ -1,13 +1,13 @@
 # coding=utf-8
 from string import punctuation, digits
-from typing import List
+from typing import List, Tuple, Iterable
 # from chemdataextractor.doc.text import Span, Text, Sentence
 from chemdataextractor.text.normalize import chem_normalize
-from pymatgen.core.composition import Composition
 
-from ..nlp import LText, CNer
+from ..nlp import LText, CNer, tag_sentences
 from ..parse import *
 from ..utils import any_func
+from ..stats import stage, count
 
 reference_symbols = punctuation + digits
 
@@ -27,18 +27,48 @@ class BatteriesTextProcessor:
             special_normal (bool): Whether more specific normalization is needed. Defaults to False.
         """
         self.preprocessed_text = ''
+        # (paragraph, [(start, end, [(cem_start, cem_end), ...]), ...]) for each processed paragraph.
+        self.tagged_paragraphs = None
 
         if normalize:
             self.processed_text = self.final_processed_text(text, special_normal=special_normal)
         else:
             self.processed_text = text
 
+    @classmethod
+    def from_texts(cls, texts: Iterable[str], special_normal: bool = False) -> List['BatteriesTextProcessor']:
+        """
+        Process many texts, tagging the sentences of all of them in shared batches.
+
+        Returns:
+            For each text, the same as ``BatteriesTextProcessor(text, special_normal=special_normal)``.
+        """
+        processors, paragraphs = [], []
+        with stage('text_processing'):
+            for text in texts:
+                processor = cls(normalize=False)
+                paragraphs.append(processor.segment(text, special_normal=special_normal))
+                processors.append(processor)
+
+            tag_sentences(sentence for pars in paragraphs for par in pars for sentence in par.sentences)
+
+            for processor, pars in zip(processors, paragraphs):
+                processor.processed_text = processor.normalize_paragraphs(pars)
+        return processors
+
+    @stage('text_processing')
     def final_processed_text(self, text, special_normal=True) -> List[str, ]:
         """
 
         Returns:
             A list of strings where each element corresponds to a processed sentence.
         """
+        return self.normalize_paragraphs(self.segment(text, special_normal=special_normal))
+
+    def segment(self, text: str, special_normal: bool = True) -> List[LText]:
+        """
+        Clean the text and split it into paragraphs, nothing is tagged yet.
+        """
         text = self.remove_unprintable_chars(text)
 
         text = chem_normalize.normalize(text)  # Chemical text normalization
@@ -46,17 +76,91 @@ class BatteriesTextProcessor:
             self.preprocessed_text = self.replace_sub(text)
         else:
             self.preprocessed_text = text
+        return [LText(par) for par in self.preprocessed_text.split(PARAGRAPH_SEPARATOR)]
 
-        par_total = []
-        for par in self.preprocessed_text.split(PARAGRAPH_SEPARATOR):
-            cde = LText(par)
+    def normalize_paragraphs(self, paragraphs: List[LText]) -> List[str]:
+        """
+        Normalize the chemical formulas found in the paragraphs.
 
-            new_text = []
+        Returns:
+            A list of strings where each element corresponds to a processed paragraph.
+        """
+        processed = []
+        for cde in paragraphs:
+            par = []
             for sentence in cde.sentences:
-                new_text.append(self.text_process(sentence.text, sentence.cems, sentence.start))
-            par_total.append(' '.join(new_text).replace('\n', '').replace('  ', ''))
+                text, cems = self._text_process(sentence.text, sentence.cems, sentence.start)
+                count(sentences=1, cems=len(cems))
+                # The CEMs were found in the text before normalization, a changed sentence is tagged again.
+                par.append((text, cems if text == sentence.text else LText(text)))
+            processed.append(par)
+        tag_sentences(sentence for par in processed for _, cems in par if isinstance(cems, LText)
+                      for sentence in cems.sentences)
+
+        par_total, self.tagged_paragraphs = [], []
+        for par in processed:
+            new_text, sentences, offset = [], [], 0
+            for text, cems in par:
+                if isinstance(cems, LText):
+                    cems = [(cem.start, cem.end) for cem in cems.cems]
+                new_text.append(text)
+                sentences.append((offset, offset + len(text), [(offset + start, offset + end) for start, end in cems]))
+                offset += len(text) + 1
+            par_text, sentences = self._remove_with_offsets(' '.join(new_text), sentences)
+            par_total.append(par_text)
+            self.tagged_paragraphs.append((par_text, sentences))
         return par_total
 
+    def to_ltext(self, indices: Iterable[int] = None, separator: str = ' ') -> LText:
+        """
+        Join processed paragraphs into one LText, reusing the sentences and CEMs tagged during processing,
+        those of a sentence the normalization changed found in its normalized text.
+
+        Args:
+            indices (Iterable[int]): Indices of the paragraphs to join. Defaults to all of them.
+            separator (str): Paragraph separator.
+        """
+        if self.tagged_paragraphs is None:  # Not normalized, nothing has been tagged.
+            return LText(self.processed_text)
+        paragraphs = self.tagged_paragraphs if indices is None else [self.tagged_paragraphs[i] for i in indices]
+
+        texts, sentences, offset = [], [], 0
+        for par_text, par_sentences in paragraphs:
+            texts.append(par_text)
+            sentences.extend((start + offset, end + offset, [(cs + offset, ce + offset) for cs, ce in cems])
+                             for start, end, cems in par_sentences)
+            offset += len(par_text) + len(separator)
+        return LText.from_tagged(separator.join(texts), sentences)
+
+    @staticmethod
+    def _remove_with_offsets(text: str, sentences: list, targets=('\n', '  ')) -> Tuple[str, list]:
+        """
+        Same as removing each of the targets in turn with str.replace, but keeps the sentence and CEM offsets in step.
+        """
+        for target in targets:
+            if target not in text:
+                continue
+            # New position of every position in the old text, a removed character maps to where it collapsed to.
+            index, parts, last, shift = [0] * (len(text) + 1), [], 0, 0
+            found = text.find(target)
+            while found > -1:
+                for i in range(last, found):
+                    index[i] = i - shift
+                for i in range(found, found + len(target)):
+                    index[i] = found - shift
+                parts.append(text[last:found])
+                shift += len(target)
+                last = found + len(target)
+                found = text.find(target, last)
+            for i in range(last, len(text) + 1):
+                index[i] = i - shift
+            parts.append(text[last:])
+
+            text = ''.join(parts)
+            sentences = [(index[start], index[end], [(index[cs], index[ce]) for cs, ce in cems])
+                         for start, end, cems in sentences]
+        return text, [sentence for sentence in sentences if sentence[0] < sentence[1]]
+
     @staticmethod
     def replace_sub(text):
         """
@@ -80,25 +184,24 @@ class BatteriesTextProcessor:
         """
         The main thing here is to clean the text to return the normalized chemical formula expression
         """
-        new_text = []
-        if len(cem) == 1:
-            start, end = cem[0].start - s_start, cem[0].end - s_start
-            normalized_cem = self.ner.normalized_compound_formula(cem[0].text)
-            new_text.extend([text[: start], normalized_cem, text[end:]])
-            return ''.join(new_text)
-        elif len(cem) > 1:
-            # offset = before = 0
-            before = 0
-            for num, ce in enumerate(cem):
-                # start, end = ce.start + offset, ce.end + offset
-                start, end = ce.start - s_start, ce.end - s_start
-                normalized_cem = self.ner.normalized_compound_formula(ce.text)
-                new_text.extend([text[before: start], normalized_cem, text[end: cem[num + 1].start - s_start]]
-                                if num + 1 < len(cem) else [text[before: start], normalized_cem + text[end:]])
-                # offset += ce.length - len(normalized_cem)
-                before = cem[num + 1].start - s_start if num + 1 < len(cem) else end
-            return ''.join(new_text)
-        return text
+        return self._text_process(text, cem, s_start)[0]
+
+    def _text_process(self, text: str, cem: list, s_start: int) -> Tuple[str, List[Tuple[int, int]]]:
+        """
+        Returns:
+            The cleaned sentence and the spans of the normalized chemical formulas in it.
+        """
+        new_text, spans, length, before = [], [], 0, 0
+        for ce in cem:
+            start, end = ce.start - s_start, ce.end - s_start
+            normalized_cem = self.ner.normalized_compound_formula(ce.text)
+            new_text.extend([text[before: start], normalized_cem])
+            length += len(new_text[-2])
+            spans.append((length, length + len(normalized_cem)))
+            length += len(normalized_cem)
+            before = end
+        new_text.append(text[before:])
+        return ''.join(new_text), spans
 
     @staticmethod
     def remove_unprintable_chars(s: str) -> str:
@@ -0,0 +1,76 @@
+# coding=utf-8
+"""
+Threads of torch, ONNX Runtime and the HuggingFace tokenizers in each process of a run.
+"""
+import os
+import logging
+from typing import NamedTuple, Optional
+
+__all__ = ['ThreadConfig', 'default_threads', 'set_threads', 'current_threads', 'cpu_count']
+
+log = logging.getLogger(__name__)
+
+
+class ThreadConfig(NamedTuple):
+    """
+    Threads of one process. The worker processes of a pool together should not use more threads than there are
+    cores, or they preempt each other and the throughput drops below that of fewer workers.
+    """
+    intra_op: int = 1
+    inter_op: int = 1
+    tokenizers_parallelism: bool = False
+
+
+_current: Optional[ThreadConfig] = None
+
+
+def cpu_count() -> int:
+    """
+    CPUs this process may run on, which is fewer than ``os.cpu_count()`` under taskset or a container cpuset.
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def default_threads(workers: int = 1) -> ThreadConfig:
+    """
+    The cores split evenly between ``workers`` processes. A single process also tokenizes in parallel,
+    with several the workers already keep the cores busy.
+    """
+    workers = max(workers, 1)
+    intra_op = max(cpu_count() // workers, 1)
+    return ThreadConfig(intra_op=intra_op, inter_op=1 if workers > 1 else min(intra_op, 4),
+                        tokenizers_parallelism=workers == 1)
+
+
+def set_threads(config: ThreadConfig):
+    """
+    Apply ``config`` to this process: the torch thread pools, the ONNX Runtime taggers built afterwards,
+    ``TOKENIZERS_PARALLELISM`` and the OpenMP and MKL variables seen by libraries loaded later
+    and by child processes.
+    """
+    global _current
+    os.environ['TOKENIZERS_PARALLELISM'] = 'true' if config.tokenizers_parallelism else 'false'
+    # The Rust thread pool of the tokenizers, sized on its first use.
+    os.environ['RAYON_NUM_THREADS'] = str(config.intra_op)
+    os.environ['OMP_NUM_THREADS'] = os.environ['MKL_NUM_THREADS'] = str(config.intra_op)
+
+    import torch
+    torch.set_num_threads(config.intra_op)
+    if torch.get_num_interop_threads() != config.inter_op:
+        try:
+            torch.set_num_interop_threads(config.inter_op)
+        except RuntimeError:
+            # Only allowed once, before any inter-op parallel work. Forked workers inherit it from the parent.
+            log.warning('Inter-op threads of process %d stay %d, not %d.', os.getpid(),
+                        torch.get_num_interop_threads(), config.inter_op)
+    _current = config
+
+
+def current_threads() -> Optional[ThreadConfig]:
+    """
+    The config last applied in this process, None if the library defaults are in place.
+    """
+    return _current
@@ -5,7 +5,14 @@ import shutil
 import time
 import json
 
-import pandas as pd
+from .parse.regex_pattern import BACKSLASH_REPLACEMENT
+
+
+def doi_from_filename(name: str) -> str:
+    """
+    Doi of a document file named after it, where '/' is replaced by '$$', e.g. 10.1016$$j.ensm.2023.102952.xml.
+    """
+    return os.path.basename(name).rsplit(".", 1)[0].replace(BACKSLASH_REPLACEMENT, "/")
 
 
 def if_num_dot(str_):
@@ -20,14 +20,17 @@ setup(
         'text2chem==0.0.3',
         'pymatgen',
     ],
+    python_requires='>=3.7',
     license='MIT',
     packages=find_packages(),
+    entry_points={
+        'console_scripts': ['cathodedataextractor = cathodedataextractor.cli:main'],
+    },
     classifiers=[
         'Intended Audience :: Developers',
         'Intended Audience :: Science/Research',
         'License :: OSI Approved :: MIT License',
         'Operating System :: OS Independent',
-        'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7',
         'Topic :: Scientific/Engineering',
         'Topic :: Text Processing',
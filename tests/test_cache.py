@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+import os
+import pickle
+import unittest
+import tempfile
+import threading
+from cathodedataextractor.cache import ResultCache, TagCache, LRUCache
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'cache.sqlite')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_get_put(self):
+        cache = ResultCache(self.path)
+        key = cache.key(b'file', b'content')
+
+        self.assertIsNone(cache.get(key))
+        cache.put(key, {'Name': 'LiFePO4'})
+        self.assertEqual(cache.get(key), {'Name': 'LiFePO4'})
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_fingerprint(self):
+        old, new = ResultCache(self.path, fingerprint='old'), ResultCache(self.path, fingerprint='new')
+        self.assertNotEqual(old.key(b'content'), new.key(b'content'))
+
+        old.put(old.key(b'content'), 1)
+        new.put(new.key(b'content'), 2)
+        self.assertEqual(new.invalidate(stale_only=True), 1)
+        self.assertEqual(len(new), 1)
+        self.assertEqual(new.invalidate(), 1)
+        self.assertEqual(len(new), 0)
+
+    def test_eviction(self):
+        cache = ResultCache(self.path, max_size=250)
+        for i in range(3):
+            cache.put(cache.key(bytes([i])), b'x' * 100)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(cache.key(bytes([0]))))
+        self.assertLessEqual(cache.size, 250)
+
+    def test_size(self):
+        cache = ResultCache(self.path)
+        cache.put('a', b'x' * 100)
+        cache.put('b', b'x' * 100)
+        cache.put('a', b'x' * 300)
+        size = cache.conn.execute('SELECT SUM(size) FROM results').fetchone()[0]
+        self.assertEqual(cache.size, size)
+        cache.close()
+        self.assertEqual(ResultCache(self.path).size, size)
+
+    def test_touch_interval(self):
+        cache = ResultCache(self.path, touch_interval=3600)
+        cache.put('a', 1)
+        accessed = cache.conn.execute("SELECT accessed FROM results WHERE key = 'a'").fetchone()[0]
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.conn.execute("SELECT accessed FROM results WHERE key = 'a'").fetchone()[0], accessed)
+
+    def test_threads(self):
+        cache = ResultCache(self.path)
+        cache.put('shared', 0)
+        errors = []
+
+        def use(i):
+            try:
+                for j in range(20):
+                    cache.put('{}-{}'.format(i, j), j)
+                    cache.get('shared')
+            except Exception as e:
+                errors.append(e)
+
+        # The connection was opened by this thread.
+        threads = [threading.Thread(target=use, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(cache), 81)
+        self.assertEqual(cache.hits, 80)
+        cache.close()
+
+
+class TestTagCache(unittest.TestCase):
+
+    def test_memory(self):
+        cache = TagCache(max_entries=2)
+        keys = [cache.key('bert-crf-torch', text) for text in ('a', 'b', 'c')]
+        self.assertNotEqual(keys[0], cache.key('bert-crf-onnx', 'a'))
+
+        self.assertIsNone(cache.get(keys[0]))
+        for key in keys:
+            cache.put(key, ['B-CM'])
+        self.assertIsNone(cache.get(keys[0]))
+        self.assertEqual(cache.get(keys[2]), ['B-CM'])
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertAlmostEqual(cache.stats()['hit_rate'], 1 / 3)
+
+    def test_disk(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = TagCache(path=os.path.join(tmp, 'tags.sqlite'))
+            key = cache.key('bert-crf-torch', 'LiFePO4 was used as the cathode.')
+            cache.put(key, ['B-CM', 'O', 'O', 'O', 'O', 'O', 'O'])
+
+            # As a worker process gets it, with the disk tier only.
+            worker = pickle.loads(pickle.dumps(cache))
+            self.assertEqual(worker.stats()['entries'], 0)
+            self.assertEqual(worker.get(key)[0], 'B-CM')
+            self.assertEqual(worker.stats()['entries'], 1)
+            worker.disk.close()
+            cache.disk.close()
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_bounded(self):
+        cache = LRUCache(max_entries=2)
+        cache.put('a', False)
+        cache.put('b', 1)
+        self.assertIs(cache.get('a'), False)
+        cache.put('c', 2)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('x', 'default'), 'default')
+        self.assertEqual(len(cache), 2)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+        cache.resize(1)
+        self.assertEqual(list(cache.entries), ['c'])
+        restored = pickle.loads(pickle.dumps(cache))
+        self.assertEqual((len(restored), restored.max_entries), (0, 1))
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import argparse
+import unittest
+import tempfile
+from tests.resources import TEST_PATH
+from cathodedataextractor.cli import main, expand_inputs, parse_shard
+
+DOCUMENT = f"{TEST_PATH}/10.1016$$j.ensm.2023.102952.xml"
+
+
+class TestCli(unittest.TestCase):
+
+    def test_expand_inputs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ('a.xml', 'b.html', 'c.txt'):
+                open(os.path.join(tmp, name), 'w').close()
+            file_list = os.path.join(tmp, 'list.txt')
+            with open(file_list, 'w') as f:
+                f.write('x.xml\n\ny.xml\n')
+
+            self.assertEqual(expand_inputs([tmp]), [os.path.join(tmp, 'a.xml'), os.path.join(tmp, 'b.html')])
+            self.assertEqual(expand_inputs([os.path.join(tmp, '*.xml'), '@' + file_list, 'x.xml']),
+                             [os.path.join(tmp, 'a.xml'), 'x.xml', 'y.xml'])
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard('1/4'), (1, 4))
+        self.assertRaises(argparse.ArgumentTypeError, parse_shard, '4/4')
+        self.assertRaises(argparse.ArgumentTypeError, parse_shard, 'a/4')
+
+    def test_extract(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'records.jsonl')
+            self.assertEqual(main(['extract', DOCUMENT, '--output', output]), 0)
+            self.assertEqual(main(['extract', DOCUMENT, '--output', output, '--resume']), 0)
+
+            with open(output, encoding='utf-8') as f:
+                lines = [json.loads(line) for line in f]
+            self.assertEqual(len(lines), 1)
+            self.assertEqual(lines[0]['doi'], '10.1016/j.ensm.2023.102952')
+            self.assertTrue(lines[0]['records'])
+
+    def test_resume_parquet(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'records.parquet')
+            with self.assertRaises(SystemExit) as raised:
+                main(['extract', DOCUMENT, '--output', output, '--resume'])
+            self.assertIn('--resume cannot append', str(raised.exception.code))
+            self.assertFalse(os.path.exists(output))
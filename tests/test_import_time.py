@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import json
+import tempfile
+import unittest
+import subprocess
+
+# Seconds each module of the package may take to import in a fresh interpreter, on top of its required
+# dependencies (DEPENDENCIES), which are imported first and not timed.
+IMPORT_BUDGETS = {
+    'cathodedataextractor': 0.5,
+    'cathodedataextractor.nlp': 1.,
+    'cathodedataextractor.information_extraction_pipe': 1.5,
+}
+SCALE = float(os.environ.get('CATHODEDATAEXTRACTOR_IMPORT_BUDGET_SCALE', 1.))
+
+DEPENDENCIES = ['regex', 'bs4', 'chemdataextractor', 'chemdataextractor.doc.text', 'chemdataextractor.nlp.new_cem',
+                'chemdataextractor.nlp.cem', 'chemdataextractor.nlp.pos']
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = '''
+import sys, json, time, importlib
+for name in {dependencies!r}:
+    importlib.import_module(name)
+start = time.perf_counter()
+importlib.import_module({module!r})
+elapsed = time.perf_counter() - start
+print(json.dumps({{'elapsed': elapsed, 'modules': sorted(sys.modules)}}))
+'''
+
+
+def import_in_subprocess(module: str, cwd: str) -> dict:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+    out = subprocess.run([sys.executable, '-c', SCRIPT.format(dependencies=DEPENDENCIES, module=module)],
+                         cwd=cwd, env=env, stdout=subprocess.PIPE, check=True).stdout
+    return json.loads(out.decode('utf-8').strip().splitlines()[-1])
+
+
+class TestImportTime(unittest.TestCase):
+
+    def test_import(self):
+        heavy = {'pandas', 'pymatgen', 'text2chem', 'onnxruntime'}
+        for module, budget in IMPORT_BUDGETS.items():
+            with self.subTest(module=module):
+                with tempfile.TemporaryDirectory() as cwd:
+                    result = import_in_subprocess(module, cwd)
+                    # No side effects at import.
+                    self.assertEqual(os.listdir(cwd), [])
+
+                self.assertLess(result['elapsed'], budget * SCALE)
+                self.assertFalse(heavy.intersection(name.split('.')[0] for name in result['modules']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+import os
+import unittest
+import tempfile
+from multiprocessing import Pool
+from cathodedataextractor.manifest import Manifest
+
+
+def _record(args):
+    manifest_path, i = args
+    Manifest(manifest_path).record(f'doc{i}.xml', location='out.jsonl', sha256=Manifest.digest(i))
+
+
+class TestManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'manifest.jsonl')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_resume(self):
+        manifest = Manifest(self.path, location='out.jsonl')
+        manifest.record('a.xml', sha256=Manifest.digest([{'Name': 'LiFePO4'}]))
+        manifest.record('b.xml', error='FileNotFoundError: b.xml')
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write('{"key": "c.x')  # Cut short by a crash.
+
+        resumed = Manifest(self.path)
+        self.assertIn('a.xml', resumed)
+        self.assertNotIn('b.xml', resumed)
+        self.assertEqual(len(resumed), 1)
+
+        resumed.record('d.xml')
+        self.assertIn('d.xml', Manifest(self.path))
+
+    def test_processes(self):
+        with Pool(4) as pool:
+            pool.map(_record, [(self.path, i) for i in range(100)])
+
+        manifest = Manifest(self.path)
+        self.assertEqual(len(manifest), 100)
+        self.assertIn('doc99.xml', manifest)
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import unittest
+import threading
+from cathodedataextractor.nlp.cdetext import LText, LazyCemTagger, NER_TAG_TYPE, POS_TAG_TYPE, length_buckets
+from cathodedataextractor.nlp.modi_cde_nlp import ModiBertWordTokenizer
+
+
+class TestLazyCemTagger(unittest.TestCase):
+
+    def test_built_on_first_use(self):
+        tagger = LazyCemTagger()
+        text = LText('LiFePO4 was used as the cathode.', taggers=[tagger])
+        self.assertEqual(len(text.sentences), 1)
+        self.assertTrue(tagger.can_tag(NER_TAG_TYPE))
+        self.assertFalse(tagger.can_tag(POS_TAG_TYPE))
+        self.assertFalse(tagger.built)
+
+        self.assertEqual([cem.text for cem in text.cems], ['LiFePO4'])
+        self.assertTrue(tagger.built)
+
+    def test_built_once(self):
+        tagger, built = LazyCemTagger(), []
+        threads = [threading.Thread(target=lambda: built.append(tagger.tagger)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(built), 4)
+        self.assertEqual(len(set(map(id, built))), 1)
+
+
+class TestLengthBuckets(unittest.TestCase):
+
+    def test_buckets(self):
+        lengths = [30, 5, 200, 6, 31, 7, 400]
+        buckets = length_buckets(lengths, token_budget=64)
+
+        self.assertEqual(sorted(i for bucket in buckets for i in bucket), list(range(len(lengths))))
+        self.assertEqual(buckets, [[1, 3, 5], [0, 4], [2], [6]])
+        for bucket in buckets[:2]:
+            self.assertLessEqual(len(bucket) * max(lengths[i] for i in bucket), 64)
+        self.assertEqual(length_buckets(lengths, token_budget=10 ** 6, max_size=3), [[1, 3, 5], [0, 4, 2], [6]])
+        self.assertEqual(length_buckets([], token_budget=64), [])
+
+    def test_passage_tagged_together(self):
+        text = LText('LiFePO4 was used as the cathode. The Na2MnO3 electrode was cycled at 1C.')
+        first, second = text.sentences
+        self.assertEqual([cem.text for cem in first.cems], ['LiFePO4'])
+        self.assertIn(NER_TAG_TYPE, second.tokens[0]._tags)
+
+
+class TestTrigger(unittest.TestCase):
+
+    def test_only_triggered_sentences_tagged(self):
+        text = LText('LiFePO4 delivered 160 mAhg-1. The NaCl solution was stirred. It retained 95% after 100 cycles.',
+                     trigger=lambda s: 'mAhg-1' in s or '%' in s)
+        first, second, third = text.sentences
+        self.assertFalse(first._tag_columns)
+
+        self.assertEqual([cem.text for cem in first.cems], ['LiFePO4'])
+        self.assertIn(NER_TAG_TYPE, third._tag_columns)
+        self.assertNotIn(NER_TAG_TYPE, second._tag_columns)
+
+        self.assertEqual([cem.text for cem in second.cems], ['NaCl'])
+
+
+class TestBatchTokenize(unittest.TestCase):
+
+    def test_same_spans(self):
+        tokenizer = ModiBertWordTokenizer()
+        texts = ['LiFePO4 was used as the cathode.',
+                 'The capacity was 150.5 mAh g-1 at -20 °C and 0.5-1.0 V.',
+                 'Li1.2Ni0.13Co0.13Mn0.54O2, i.e. Li-rich NCM, delivered 250 mAh/g.',
+                 '']
+        self.assertEqual(tokenizer.span_tokenize_batch(texts), [tokenizer.span_tokenize(text) for text in texts])
+
+    def test_passage_tokenized_together(self):
+        text = LText('LiFePO4 was used as the cathode. The Na2MnO3 electrode was cycled at 1C.')
+        first, second = text.sentences
+        self.assertEqual([token.text for token in first.tokens], ['LiFePO4', 'was', 'used', 'as', 'the', 'cathode', '.'])
+        self.assertIsNotNone(second._starts)
+
+
+class TestCompactTokens(unittest.TestCase):
+
+    def test_views(self):
+        text = LText('Then LiFePO4 was used.')
+        sentence = text.sentences[0]
+        token = sentence.tokens[1]
+        self.assertFalse(hasattr(token, '__dict__'))
+        self.assertEqual((token.text, token.start, token.end), ('LiFePO4', 5, 12))
+        self.assertEqual(sentence.raw_tokens, ['Then', 'LiFePO4', 'was', 'used', '.'])
+
+        self.assertEqual(token.ner_tag, 'B-CM')
+        self.assertEqual(token[1], 'B-CM')
+        self.assertEqual(sentence._tag_columns[NER_TAG_TYPE][1], 'B-CM')
+        self.assertIn(NER_TAG_TYPE, token._tags)
+        self.assertIs(sentence.tokens[1], token)
+
+    def test_tagged_without_views(self):
+        text = LText('LiFePO4 was used as the cathode. The Na2MnO3 electrode was cycled at 1C.')
+        first, second = text.sentences
+        self.assertEqual(first.raw_tokens[0], 'LiFePO4')
+        # Tagging does not keep the token views of the sentences.
+        self.assertNotIn(NER_TAG_TYPE, second._tag_columns)
+        self.assertEqual([cem.text for cem in first.cems], ['LiFePO4'])
+        self.assertEqual(second._tag_columns[NER_TAG_TYPE][1], 'B-CM')
+        self.assertNotIn('_tokens', second.__dict__)
+
+
+if __name__ == '__main__':
+    unittest.main()
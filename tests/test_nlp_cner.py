@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 import unittest
 
-from cathodedataextractor.nlp import CNer
+from cathodedataextractor.nlp import CNer, cner
 
 
 class TestCNer(unittest.TestCase):
@@ -83,3 +83,26 @@ class TestCNer(unittest.TestCase):
         self.assertEqual(self.ner.prompt_tag('Mn-Na-Mn'), 'irregular_shape')
         self.assertEqual(self.ner.prompt_tag('P2/O3-NMT3'), 'is_likely_abbreviation')
         self.assertEqual(self.ner.prompt_tag('Ti-doped-NNMOF'), 'is_likely_abbreviation')
+
+
+class TestCNerCache(unittest.TestCase):
+
+    def test_shared_and_bounded(self):
+        cner.clear_caches()
+        first, second, other = CNer(), CNer(), CNer(prompt_element='Li')
+        self.assertEqual(first.separate_phase('P2-Na0.67MnO2'), ('P2', 'Na0.67MnO2'))
+        self.assertEqual(second.separate_phase('P2-Na0.67MnO2'), ('P2', 'Na0.67MnO2'))
+        other.separate_phase('P2-Na0.67MnO2')
+        stats = first.cache_stats()['separate_phase']
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 1, 1))
+        self.assertEqual(other.cache_stats()['separate_phase']['hits'], 0)
+        self.assertIn('False/Li/separate_phase', cner.cache_stats())
+
+        size = cner.CACHE_SIZE
+        try:
+            cner.set_cache_size(2)
+            for formula in ('NaCl', 'NaF', 'Na2CO3'):
+                first.separate_phase(formula)
+            self.assertEqual(first.cache_stats()['separate_phase']['entries'], 2)
+        finally:
+            cner.set_cache_size(size)
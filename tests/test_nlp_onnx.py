@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+import os
+import unittest
+import importlib.util
+from tests.resources import TEST_PATH
+from cathodedataextractor.parse import PARAGRAPH_SEPARATOR
+from cathodedataextractor.information_extraction_pipe import Pipeline
+from chemdataextractor.nlp.new_cem import CemTagger, BertFinetunedCRFCemTagger
+from cathodedataextractor.nlp import LText, cem_mode, warmup, CEM_MODES
+
+DOCUMENT = f"{TEST_PATH}/10.1016$$j.ensm.2023.102952.xml"
+
+
+def document_cems(paragraphs, mode):
+    with cem_mode(mode):
+        return {(i, cem.start, cem.end) for i, par in enumerate(paragraphs) for cem in LText(par).cems}
+
+
+@unittest.skipIf(importlib.util.find_spec('onnxruntime') is None, 'needs onnxruntime')
+class TestOnnxBackend(unittest.TestCase):
+
+    def test_parity(self):
+        data = Pipeline._collect_corpus(*os.path.split(DOCUMENT))
+        paragraphs = [par for par in PARAGRAPH_SEPARATOR.join([data.experiment, data.property_text])
+                      .split(PARAGRAPH_SEPARATOR) if par.strip()]
+        expected, found = document_cems(paragraphs, 'bert'), document_cems(paragraphs, 'onnx')
+
+        self.assertTrue(expected)
+        precision, recall = len(expected & found) / len(found), len(expected & found) / len(expected)
+        self.assertGreaterEqual(2 * precision * recall / (precision + recall), 0.95)
+
+    def test_own_ensembles(self):
+        from cathodedataextractor.nlp.onnx_tagger import OnnxBertCrfCemTagger
+        default = CemTagger.taggers[2]
+        warmup('bert')
+        warmup('onnx')
+        bert, onnx = CEM_MODES['bert'][0].tagger, CEM_MODES['onnx'][0].tagger
+        self.assertIsInstance(bert.taggers[2], BertFinetunedCRFCemTagger)
+        self.assertNotIsInstance(bert.taggers[2], OnnxBertCrfCemTagger)
+        self.assertIsInstance(onnx.taggers[2], OnnxBertCrfCemTagger)
+        self.assertIs(CemTagger.taggers[2], default)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+import unittest
+from cathodedataextractor.nlp.prefilter import ChemPrefilter, is_candidate
+
+
+class TestChemPrefilter(unittest.TestCase):
+
+    def test_candidates(self):
+        for token in ['LiFePO4', 'NaCl', 'Na0.67Ni0.33Mn0.67O2', 'Li', 'PVDF', 'NCM811', 'LiTFSI', 'lithium',
+                      'carbonate', 'ethylene', 'graphite', 'dimethyl', 'methanol', 'propylene', 'benzene', 'phenol',
+                      'hexane', 'manganese', 'ferric', 'sulfuric', 'lithiated']:
+            self.assertTrue(is_candidate(token), token)
+        for token in ['The', 'In', 'C', 'V', '1C', '4.3', 'mAh', 'g-1', 'capacity', 'rate', 'cathode', 'was',
+                      'method', 'methods', 'property', 'properties', 'proposed', 'hexagonal', 'pentagon',
+                      'phenomenon', 'ethics', 'tiny', 'leading', 'membrane', 'Method', 'Property']:
+            self.assertFalse(is_candidate(token), token)
+
+    def test_threshold(self):
+        tokens = 'The LiFePO4 cathode delivered 160 mAh g-1 at 0.1 C .'.split()
+        self.assertTrue(ChemPrefilter()(tokens))
+        self.assertFalse(ChemPrefilter(threshold=2)(tokens))
+        self.assertFalse(ChemPrefilter()('The capacity faded after 100 cycles .'.split()))
+        self.assertFalse(ChemPrefilter()('The property was evaluated by the proposed method .'.split()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+import gc
+import os
+import unittest
+import tempfile
+from tests.resources import TEST_PATH
+from cathodedataextractor.cache import ResultCache, TagCache
+from cathodedataextractor.stats import CorpusStats
+from cathodedataextractor.manifest import Manifest
+from cathodedataextractor.nlp import ChemPrefilter, LText, get_tag_cache, get_prefilter, using_tag_cache
+from cathodedataextractor.information_extraction_pipe import Pipeline, preload
+
+DOCUMENT = f"{TEST_PATH}/10.1016$$j.ensm.2023.102952.xml"
+MISSING = f"{TEST_PATH}/10.1016$$j.missing.xml"
+
+
+class TestPipeline(unittest.TestCase):
+
+    def test_extract_many(self):
+        pipeline = Pipeline()
+        results = pipeline.extract_many([DOCUMENT, MISSING], workers=2)
+
+        self.assertEqual([res.path for res in results], [DOCUMENT, MISSING])
+        self.assertIsNone(results[0].error)
+        self.assertEqual(results[0].prep_data['doi'], '10.1016/j.ensm.2023.102952')
+        self.assertTrue(results[1].error.startswith('FileNotFoundError'))
+        self.assertIsNone(results[1].prep_data)
+
+    def test_extract_many_unordered(self):
+        pipeline = Pipeline()
+        results = pipeline.extract_many([MISSING, DOCUMENT], workers=2, ordered=False)
+
+        self.assertEqual(sorted(res.path for res in results), sorted([DOCUMENT, MISSING]))
+
+    def test_iter_extract(self):
+        pipeline = Pipeline()
+        results = pipeline.iter_extract((path for path in [MISSING, DOCUMENT, MISSING]), workers=2, max_pending=1)
+
+        self.assertEqual(next(results).path, MISSING)
+        self.assertIsNone(next(results).error)
+        self.assertEqual(next(results).path, MISSING)
+        self.assertRaises(StopIteration, next, results)
+
+    def test_extract_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ResultCache(os.path.join(tmp, 'cache.sqlite'))
+            pipeline = Pipeline(cache=cache)
+            first, second = pipeline.extract(DOCUMENT), pipeline.extract(DOCUMENT)
+
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+            self.assertEqual(first.post_relation_extract_res, second.post_relation_extract_res)
+            cache.close()
+
+    def test_extract_cache_workers(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ResultCache(os.path.join(tmp, 'cache.sqlite'))
+            pipeline = Pipeline(cache=cache)
+            pipeline.extract(DOCUMENT)
+            results = pipeline.extract_many([DOCUMENT, DOCUMENT], workers=2)
+
+            # The hits of the workers are counted in this process.
+            self.assertEqual((cache.hits, cache.misses), (2, 1))
+            self.assertEqual([res.stats['cache']['cache_hits'] for res in results], [1, 1])
+            cache.close()
+
+    def test_extract_string_cache(self):
+        text = 'The Na2RuO3 cathode delivers a capacity of 180 mAh g–1 at 0.2C.'
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ResultCache(os.path.join(tmp, 'cache.sqlite'))
+            corpus = CorpusStats()
+            pipeline = Pipeline(cache=cache, hooks=[corpus])
+            first, second = pipeline.extract_string(text), pipeline.extract_strings([text])[0]
+
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+            self.assertEqual(first.post_relation_extract_res, second.post_relation_extract_res)
+            self.assertEqual(corpus.documents, 2)
+            self.assertEqual((corpus.stages['cache']['cache_hits'], corpus.stages['cache']['cache_misses']), (1, 1))
+            cache.close()
+
+    def test_stats(self):
+        corpus = CorpusStats()
+        pipeline = Pipeline(hooks=[corpus])
+        output = pipeline.extract(DOCUMENT)
+
+        for name in ('classification', 'preprocessing', 'relation_extraction', 'text_processing',
+                     'abbreviation_detection', 'experimental_extraction', 'property_extraction'):
+            self.assertIn(name, output.stats)
+        self.assertGreater(output.stats['text_processing']['sentences'], 0)
+        self.assertEqual(corpus.documents, 1)
+
+    def test_iter_extract_manifest(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'manifest.jsonl')
+            pipeline = Pipeline()
+
+            self.assertEqual(len(list(pipeline.iter_extract([DOCUMENT, MISSING], manifest=Manifest(path)))), 2)
+            resumed = list(pipeline.iter_extract([DOCUMENT, MISSING], manifest=Manifest(path)))
+            self.assertEqual([res.path for res in resumed], [MISSING])
+
+    def test_iter_extract_staged(self):
+        pipeline = Pipeline()
+        results = list(pipeline.iter_extract_staged([DOCUMENT, MISSING, DOCUMENT]))
+
+        self.assertEqual([res.path for res in results], [DOCUMENT, MISSING, DOCUMENT])
+        self.assertTrue(results[1].error.startswith('FileNotFoundError'))
+        self.assertEqual(results[0].post_relation_extract_res, results[2].post_relation_extract_res)
+        self.assertIn('relation_extraction', results[0].stats)
+
+    def test_iter_extract_staged_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ResultCache(os.path.join(tmp, 'cache.sqlite'))
+            tag_cache = TagCache(path=os.path.join(tmp, 'tags.sqlite'))
+            # The caches are opened here and used from the stage threads.
+            cache.size, tag_cache.disk.size
+            pipeline = Pipeline(cache=cache, tag_cache=tag_cache)
+            first = list(pipeline.iter_extract_staged([DOCUMENT]))
+            self.assertIsNone(first[0].error)
+            self.assertEqual((cache.hits, cache.misses), (0, 1))
+            self.assertGreater(tag_cache.misses, 0)
+
+            second = list(pipeline.iter_extract_staged([DOCUMENT, DOCUMENT]))
+            self.assertEqual([res.error for res in second], [None, None])
+            self.assertEqual((cache.hits, cache.misses), (2, 1))
+            self.assertEqual(second[0].post_relation_extract_res, first[0].post_relation_extract_res)
+            cache.close()
+            tag_cache.disk.close()
+
+    def test_iter_extract_guarded(self):
+        pipeline = Pipeline(timeout=600, max_rss=64 << 30)
+        results = list(pipeline.iter_extract([DOCUMENT, MISSING], workers=2))
+
+        self.assertIsNone(results[0].error)
+        self.assertTrue(results[1].error.startswith('FileNotFoundError'))
+
+        pipeline = Pipeline(timeout=1e-3)
+        self.assertTrue(next(pipeline.iter_extract([DOCUMENT])).error.startswith('DocumentTimeout'))
+
+    def test_from_strings(self):
+        texts = ['The Na2RuO3 cathode delivers a capacity of 180 mAh g–1 at 0.2C with a capacity retention '
+                 'of 89% for over 50 cycles.',
+                 '',
+                 'NaNi1/3Fe1/3Mn1/3O2 (NFM) retains 92% of its capacity after 100 cycles at 1C.']
+        results = Pipeline.from_strings(texts, batch_size=2)
+
+        self.assertEqual(len(results), 3)
+        for text, res in zip(texts, results):
+            single = Pipeline.from_string(text)
+            self.assertEqual(res.prep_data_csie, single.prep_data_csie)
+            self.assertEqual(res.post_relation_extract_res, single.post_relation_extract_res)
+
+    def test_rules_mode(self):
+        self.assertRaises(ValueError, Pipeline, mode='nope')
+        output = Pipeline(mode='rules').extract(DOCUMENT)
+
+        self.assertIsNone(output.error)
+        self.assertEqual(output.prep_data['doi'], '10.1016/j.ensm.2023.102952')
+        self.assertGreater(output.stats['text_processing']['cems'], 0)
+
+    def test_preload(self):
+        frozen = gc.get_freeze_count()
+        preload('rules')
+        preload('rules')
+        # The caller's collector is left alone, only the workers freeze what they inherit.
+        self.assertEqual(gc.get_freeze_count(), frozen)
+        results = Pipeline(mode='rules', preload=True).extract_many([DOCUMENT, DOCUMENT], workers=2)
+        self.assertEqual([res.error for res in results], [None, None])
+        self.assertEqual(gc.get_freeze_count(), frozen)
+
+    def test_tag_cache_scoped(self):
+        cache = TagCache()
+        self.assertIsNone(Pipeline(tag_cache=cache).extract(DOCUMENT).error)
+        lookups = cache.hits + cache.misses
+        self.assertGreater(lookups, 0)
+        self.assertIsNone(get_tag_cache())
+
+        # A later pipeline without a cache does not use it.
+        self.assertIsNone(Pipeline().extract(DOCUMENT).error)
+        self.assertEqual(cache.hits + cache.misses, lookups)
+
+    def test_relation_tagging(self):
+        data = Pipeline()._collect_corpus(*os.path.split(DOCUMENT))
+        # Every sentence that reaches the tagger is looked up in the cache once.
+        cache = TagCache()
+        with using_tag_cache(cache):
+            prep_data, document = Pipeline._preprocess_csie(data)
+            tagged = cache.hits + cache.misses
+            self.assertGreater(tagged, 0)
+            # The document of the text processing is already tagged.
+            Pipeline._relation_extract(prep_data, document)
+            self.assertEqual(cache.hits + cache.misses, tagged)
+
+            # Rebuilt passages only tag the sentences the extraction looks at.
+            Pipeline._relation_extract(prep_data)
+            sentences = sum(len(LText(text).sentences) for text in
+                            [prep_data.experiment or prep_data.property_text] + prep_data.property_text.split('\n'))
+            self.assertGreater(cache.hits + cache.misses, tagged)
+            self.assertLess(cache.hits + cache.misses - tagged, sentences)
+
+    def test_prefilter_scoped(self):
+        # Rejects every sentence.
+        output = Pipeline(prefilter=ChemPrefilter(threshold=10 ** 6)).extract(DOCUMENT)
+        self.assertEqual(output.stats['text_processing']['cems'], 0)
+        self.assertIsNone(get_prefilter())
+
+        output = Pipeline().extract(DOCUMENT)
+        self.assertGreater(output.stats['text_processing']['cems'], 0)
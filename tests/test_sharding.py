@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import unittest
+import tempfile
+from cathodedataextractor.sharding import shard_index, shard_paths, merge_shards
+
+PATHS = [f'papers/10.1016$$j.ensm.2023.{i:06d}.xml' for i in range(200)]
+
+
+class TestSharding(unittest.TestCase):
+
+    def test_shard_index(self):
+        self.assertEqual(shard_index(PATHS[0], 4), shard_index('other/' + os.path.basename(PATHS[0]), 4))
+        shards = [list(shard_paths(PATHS, index, 4)) for index in range(4)]
+        self.assertEqual(sorted(sum(shards, [])), PATHS)
+        self.assertTrue(all(shards))
+
+    def test_merge_shards(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            first, second, output = (os.path.join(tmp, name) for name in ('0.jsonl', '1.jsonl', 'merged.jsonl'))
+            with open(first, 'w', encoding='utf-8') as f:
+                for path, error in ((PATHS[2], None), (PATHS[0], 'DocumentTimeout: exceeded 60s')):
+                    f.write(json.dumps({'path': path, 'doi': None, 'error': error, 'records': [{'Name': 'x'}]}) + '\n')
+            with open(second, 'w', encoding='utf-8') as f:
+                for path in (PATHS[0], PATHS[5], PATHS[2]):
+                    f.write(json.dumps({'path': path, 'doi': None, 'error': None, 'records': [{'Name': 'x'}]}) + '\n')
+
+            report = merge_shards([first, second], output, expected=PATHS[:3])
+            with open(output, encoding='utf-8') as f:
+                merged = [json.loads(line) for line in f]
+
+        self.assertEqual([entry['path'] for entry in merged], [PATHS[0], PATHS[2], PATHS[5]])
+        self.assertIsNone(merged[0]['error'])
+        self.assertEqual((report.documents, report.records), (3, 3))
+        self.assertEqual(report.missing, ['10.1016/j.ensm.2023.000001'])
+        # Extracted twice, unlike the failure retried in the other shard.
+        self.assertEqual(report.duplicated, ['10.1016/j.ensm.2023.000002'])
+        self.assertEqual(report.unexpected, ['10.1016/j.ensm.2023.000005'])
+        self.assertFalse(report.ok)
+
+    def test_merge_resumed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            shard, output = os.path.join(tmp, '0.jsonl'), os.path.join(tmp, 'merged.jsonl')
+            # A failure, then its retry appended by --resume.
+            with open(shard, 'w', encoding='utf-8') as f:
+                for path, error, records in ((PATHS[0], 'WorkerDied: exit code 9', []), (PATHS[1], None, [{}]),
+                                             (PATHS[0], None, [{}, {}])):
+                    f.write(json.dumps({'path': path, 'doi': None, 'error': error, 'records': records}) + '\n')
+
+            report = merge_shards([shard], output, expected=PATHS[:2])
+
+        self.assertEqual((report.documents, report.records), (2, 3))
+        self.assertEqual((report.duplicated, report.failed), ([], []))
+        self.assertTrue(report.ok)
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+import time
+import itertools
+import threading
+import unittest
+from collections import defaultdict
+from cathodedataextractor.stats import stage, count, PipelineHook
+from cathodedataextractor.staged import Stage, StagedExecutor
+
+
+def parse(item):
+    time.sleep(0.01 * (item % 3))
+    return item * 2
+
+
+@stage('tag')
+def tag(value):
+    count(sentences=1)
+    if value == 6:
+        raise ValueError('bad document')
+    return value + 1
+
+
+class Intervals(PipelineHook):
+    """
+    Start and end ticks of every stage run, from the stage threads.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ticks = itertools.count()
+        self.starts, self.ends = defaultdict(list), defaultdict(list)
+
+    def on_stage_start(self, name):
+        with self.lock:
+            self.starts[name].append(next(self.ticks))
+
+    def on_stage(self, name, seconds):
+        with self.lock:
+            self.ends[name].append(next(self.ticks))
+
+    def intervals(self, name):
+        return list(zip(self.starts[name], self.ends[name]))
+
+
+class TestStagedExecutor(unittest.TestCase):
+
+    def test_map(self):
+        executor = StagedExecutor([Stage('parse', parse, workers=3), Stage('tag', tag)])
+        results = list(executor.map(range(10)))
+
+        self.assertEqual([res.item for res in results], list(range(10)))
+        self.assertEqual(results[0].value, 1)
+        self.assertEqual(results[1].stats['tag']['sentences'], 1)
+        self.assertIsInstance(results[3].error, ValueError)
+        self.assertEqual(results[3].stage, 'tag')
+
+    def test_unordered(self):
+        executor = StagedExecutor([Stage('parse', parse, workers=3), Stage('tag', tag, workers=2)])
+        self.assertEqual(sorted(res.item for res in executor.map(range(20), ordered=False)), list(range(20)))
+
+    def test_backpressure(self):
+        consumed, threads = [], threading.active_count()
+
+        def items():
+            for i in range(100):
+                consumed.append(i)
+                yield i
+
+        executor = StagedExecutor([Stage('parse', parse, queue_size=1), Stage('tag', tag, queue_size=1)])
+        results = executor.map(items())
+        next(results)
+        time.sleep(0.2)
+        self.assertLess(len(consumed), 10)
+        results.close()
+        self.assertEqual(threading.active_count(), threads)
+
+    def test_overlap(self):
+        a_started, b_started = threading.Event(), threading.Event()
+
+        @stage('a')
+        def a(value):
+            if value == 1:
+                # Only returns early if b runs on item 0 meanwhile.
+                b_started.wait(5)
+                a_started.set()
+            return value
+
+        @stage('b')
+        def b(value):
+            if value == 0:
+                b_started.set()
+                a_started.wait(5)
+            return value
+
+        hook = Intervals()
+        executor = StagedExecutor([Stage('a', a), Stage('b', b)], hooks=[hook])
+        self.assertEqual([res.value for res in executor.map(range(3))], [0, 1, 2])
+
+        self.assertEqual(len(hook.intervals('a')), 3)
+        self.assertTrue(any(a_start < b_end and b_start < a_end for a_start, a_end in hook.intervals('a')
+                            for b_start, b_end in hook.intervals('b')))
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import unittest
+from collections import namedtuple
+from cathodedataextractor.stats import stage, count, recording, PipelineHook, CorpusStats
+
+Output = namedtuple('Output', ['error', 'stats'])
+
+
+@stage('inner')
+def inner():
+    count(sentences=2, cems=1)
+
+
+class StageNames(PipelineHook):
+
+    def __init__(self):
+        self.names = []
+
+    def on_stage(self, name, seconds):
+        self.names.append(name)
+
+
+class TestStats(unittest.TestCase):
+
+    def test_recording(self):
+        hook = StageNames()
+        with recording([hook]) as recorder:
+            with stage('outer'):
+                inner()
+                inner()
+
+        self.assertEqual(hook.names, ['inner', 'inner', 'outer'])
+        stats = recorder.as_dict()
+        self.assertEqual((stats['inner']['calls'], stats['inner']['sentences'], stats['inner']['cems']), (2, 4, 2))
+        self.assertEqual((stats['outer']['calls'], stats['outer']['sentences']), (1, 0))
+        self.assertGreaterEqual(stats['outer']['time'], stats['inner']['time'])
+
+    def test_not_recording(self):
+        inner()
+        with recording() as recorder:
+            pass
+        self.assertEqual(recorder.as_dict(), {})
+
+    def test_corpus_stats(self):
+        with recording() as recorder:
+            inner()
+        corpus = CorpusStats()
+        corpus.on_document(Output(None, recorder.as_dict()))
+        corpus.on_document(Output('FileNotFoundError: missing', None))
+
+        self.assertEqual((corpus.documents, corpus.failed), (2, 1))
+        self.assertEqual(corpus.stages['inner']['sentences'], 2)
+        self.assertIn('inner', corpus.report())
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+import unittest
+import multiprocessing
+from cathodedataextractor.stats import stage, recording
+from cathodedataextractor.supervisor import SupervisedPool, WorkerFailure, StageReporter, rss, uss
+
+_hooks = []
+_shared = None
+
+
+def _init():
+    _hooks.append(StageReporter())
+
+
+def _slow_init():
+    # Stands in for loading the models.
+    time.sleep(1.5)
+    _init()
+
+
+def _run(item):
+    with recording(_hooks):
+        with stage('parse'):
+            if item == 'slow':
+                time.sleep(30)
+            if item == 'large':
+                data = bytearray(200 << 20)
+                time.sleep(30)
+                return len(data)
+            if item == 'exit':
+                os._exit(3)
+    return item * 2
+
+
+def _memory(item):
+    return rss(os.getpid()), uss(os.getpid())
+
+
+class TestSupervisedPool(unittest.TestCase):
+
+    def test_map(self):
+        pool = SupervisedPool(2, initializer=_init, timeout=1, poll=0.1)
+        results = dict(pool.map(_run, ['a', 'slow', 'b', 'exit', 'c']))
+
+        self.assertEqual((results['a'], results['b'], results['c']), ('aa', 'bb', 'cc'))
+        self.assertEqual(results['slow'].kind, 'DocumentTimeout')
+        self.assertEqual(results['slow'].stage, 'parse')
+        self.assertEqual(results['exit'], WorkerFailure('WorkerDied', 'exit code 3', 'parse'))
+
+    def test_initializer_not_timed(self):
+        pool = SupervisedPool(1, initializer=_slow_init, timeout=1, poll=0.1)
+        results = dict(pool.map(_run, ['exit', 'a']))
+
+        self.assertEqual(results['exit'].kind, 'WorkerDied')
+        # The replacement loads for longer than the timeout before its first item.
+        self.assertEqual(results['a'], 'aa')
+
+    @unittest.skipIf(rss(os.getpid()) is None, 'needs /proc')
+    def test_max_rss(self):
+        pool = SupervisedPool(1, initializer=_init, max_rss=rss(os.getpid()) + (100 << 20), poll=0.1)
+        results = list(pool.map(_run, ['large', 'a'], ordered=True))
+
+        self.assertEqual(results[0][1].kind, 'MemoryLimitExceeded')
+        self.assertEqual(results[1], ('a', 'aa'))
+
+    @unittest.skipIf(uss(os.getpid()) is None or 'fork' not in multiprocessing.get_all_start_methods(),
+                     'needs /proc and fork')
+    def test_shared_memory(self):
+        global _shared
+        _shared = bytearray(b'x' * (100 << 20))
+        try:
+            pool = SupervisedPool(1, context=multiprocessing.get_context('fork'))
+            (_, (resident, unique)), = pool.map(_memory, ['a'])
+        finally:
+            _shared = None
+        # The parent's memory is resident in the worker but not its own.
+        self.assertGreater(resident, 100 << 20)
+        self.assertLess(unique, 50 << 20)
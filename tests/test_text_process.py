@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import unittest
+from cathodedataextractor.nlp import LText
 from cathodedataextractor.text import BatteriesTextProcessor
 
 
@@ -268,3 +269,17 @@ class TestBatteriesTextProcessor(unittest.TestCase):
         for text in texts:
             bat = BatteriesTextProcessor(text[0], special_normal=True)
             self.assertEqual(' '.join(bat.processed_text), text[1])
+
+        # Sentences of all the texts tagged in shared batches give the same result.
+        bats = BatteriesTextProcessor.from_texts([text[0] for text in texts], special_normal=True)
+        self.assertEqual([' '.join(bat.processed_text) for bat in bats], [text[1] for text in texts])
+
+    def test_to_ltext(self):
+        texts = ['The LiNi0.8Co0.1Mn0.1O2 cathode was coated. NaFe0.5 Mg0.5 O2 delivers 158 mAh g−1 at 50 mA/g.',
+                 'Na0.70Ni0.20Cu0.15Mn0.65O2 (NNCM) powder was synthesized.$$It retained 90% of the capacity.']
+        for text in texts:
+            bat = BatteriesTextProcessor(text, special_normal=True)
+            processed = ' '.join(bat.processed_text)
+            # The reused CEMs are those found by tagging the processed text from scratch.
+            self.assertEqual([(cem.text, cem.start, cem.end) for cem in bat.to_ltext().cems],
+                             [(cem.text, cem.start, cem.end) for cem in LText(processed).cems])
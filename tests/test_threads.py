@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import os
+import unittest
+from tests.resources import TEST_PATH
+from cathodedataextractor import threads
+from cathodedataextractor.threads import ThreadConfig, default_threads, set_threads, current_threads, cpu_count
+from cathodedataextractor.information_extraction_pipe import Pipeline
+
+DOCUMENT = f"{TEST_PATH}/10.1016$$j.ensm.2023.102952.xml"
+VARIABLES = ('TOKENIZERS_PARALLELISM', 'RAYON_NUM_THREADS', 'OMP_NUM_THREADS', 'MKL_NUM_THREADS')
+
+
+class TestThreads(unittest.TestCase):
+
+    def setUp(self):
+        import torch
+        self.environ = {name: os.environ.get(name) for name in VARIABLES}
+        self.current, self.torch_threads = threads._current, torch.get_num_threads()
+
+    def tearDown(self):
+        import torch
+        for name, value in self.environ.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        threads._current = self.current
+        torch.set_num_threads(self.torch_threads)
+
+    def test_default_threads(self):
+        cores = cpu_count()
+        single = default_threads(1)
+        self.assertEqual(single.intra_op, cores)
+        self.assertTrue(single.tokenizers_parallelism)
+
+        pool = default_threads(max(cores, 2))
+        self.assertEqual((pool.intra_op, pool.inter_op, pool.tokenizers_parallelism), (1, 1, False))
+        self.assertEqual(default_threads(2 * cores).intra_op, 1)
+
+    def test_set_threads(self):
+        import torch
+        set_threads(ThreadConfig(intra_op=2, inter_op=torch.get_num_interop_threads()))
+        self.assertEqual(torch.get_num_threads(), 2)
+        self.assertEqual(os.environ['TOKENIZERS_PARALLELISM'], 'false')
+        self.assertEqual(current_threads().intra_op, 2)
+
+    def test_caller_left_alone(self):
+        import torch
+        pipeline = Pipeline(mode='rules', threads=ThreadConfig(intra_op=1))
+        results = pipeline.extract_many([DOCUMENT, DOCUMENT], workers=2)
+        self.assertEqual([res.error for res in results], [None, None])
+        self.assertEqual({name: os.environ.get(name) for name in VARIABLES}, self.environ)
+        self.assertEqual((threads._current, torch.get_num_threads()), (self.current, self.torch_threads))
+
+
+if __name__ == '__main__':
+    unittest.main()